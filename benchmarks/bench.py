@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import charts  # noqa: E402
+import data_loader  # noqa: E402
+import ehp_functions as ehp  # noqa: E402
+import render_service  # noqa: E402
+import word_generation as wg  # noqa: E402
+import generate_ehp  # noqa: E402
+
+# Time and memory of each stage of a report, run one after the other in this
+# process: CSV parse, cache reload, figure of each chart, PNG render, Word
+# document, hors critères.
+#
+#   python benchmarks/bench.py --duree 240 --json apres.json --comparer avant.json
+#
+# Durations are the best of --repetitions runs. The memory is the peak of the
+# Python and numpy allocations during the stage, measured in a separate run
+# since tracing them slows everything down.
+
+
+def measure(func, repeat, memory):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cpu = time.process_time()
+        result = func()
+        wall = time.perf_counter() - start
+        cpu = time.process_time() - cpu
+        if best is None or wall < best[0]:
+            best = (wall, cpu)
+    record = {"wall_s": round(best[0], 4), "cpu_s": round(best[1], 4)}
+    if memory:
+        tracemalloc.start()
+        func()
+        record["peak_mo"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+        tracemalloc.stop()
+    return record, result
+
+
+def run(file_name, app_mode, seg, chart_names, repeat, memory, folder):
+    results = {}
+
+    def stage(name, func, times=repeat):
+        record, result = measure(func, times, memory)
+        results[name] = record
+        print(
+            "%-55s %9.3f s %9.3f s cpu %s"
+            % (
+                name,
+                record["wall_s"],
+                record["cpu_s"],
+                "%8.1f Mo" % record["peak_mo"] if memory else "",
+            ),
+            flush=True,
+        )
+        return result
+
+    columns = charts.required_columns(app_mode)
+    ehp_data = stage(
+        "csv_parse",
+        lambda: data_loader.load_data(file_name, columns, use_cache=False),
+    )
+    data_loader.load_data(file_name, columns)
+    stage("cache_load", lambda: data_loader.load_data(file_name, columns))
+
+    # The first render starts Kaleido
+    figure = ehp.build_figure(ehp_data, chart_names[0], app_mode, seg)
+    stage("kaleido_startup", lambda: render_service.render(figure), times=1)
+
+    template = os.path.join(ROOT, "template.docx")
+    for name in chart_names:
+        figure = stage(
+            "figure:" + name, lambda: ehp.build_figure(ehp_data, name, app_mode, seg)
+        )
+        image = stage("render:" + name, lambda: render_service.render(figure))
+        stage(
+            "word:" + name,
+            lambda: wg.word_generation(
+                image, "PEE", template, os.path.join(folder, name + ".docx")
+            ),
+        )
+
+    stage("hors_criteres", lambda: ehp.hors_criteres(ehp_data, seg, folder=folder))
+    results["lignes"] = len(ehp_data)
+    return results
+
+
+def compare(results, previous):
+    print("\n%-55s %10s %10s %8s" % ("étape", "avant", "après", "ratio"))
+    for name, record in results.items():
+        if not isinstance(record, dict) or name not in previous:
+            continue
+        before = previous[name]["wall_s"]
+        print(
+            "%-55s %9.3fs %9.3fs %7.2fx"
+            % (name, before, record["wall_s"], before / max(record["wall_s"], 1e-9))
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesure chaque étape d'un rapport")
+    parser.add_argument("--fichier", help="acquisition à mesurer, générée sinon")
+    parser.add_argument("--palier", choices=["900", "PQY", "DPY"], default="900")
+    parser.add_argument("--duree", type=float, default=24.0, help="en heures")
+    parser.add_argument("--periode", type=float, default=1.0, help="en secondes")
+    parser.add_argument("--seg", action="store_true")
+    parser.add_argument("--courbes", nargs="+", choices=charts.CHART_NAMES)
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--sans-memoire", action="store_true")
+    parser.add_argument("--json", help="fichier des résultats")
+    parser.add_argument("--comparer", help="résultats JSON d'une mesure précédente")
+    args = parser.parse_args(argv)
+
+    folder = tempfile.mkdtemp(prefix="ehp_bench_")
+    # The cache of the loader is written in the current folder
+    os.chdir(folder)
+    for name in ["courbes_png", "courbes_word", "Hors_critères"]:
+        os.mkdir(name)
+    try:
+        file_name = args.fichier and os.path.abspath(args.fichier)
+        if file_name is None:
+            file_name = os.path.join(folder, "ehp.csv")
+            start = time.perf_counter()
+            rows = generate_ehp.generate(
+                file_name, args.palier, args.duree, args.periode
+            )
+            print(
+                "fichier généré: %d lignes, %.1f Mo en %.1f s"
+                % (
+                    rows,
+                    os.path.getsize(file_name) / 1e6,
+                    time.perf_counter() - start,
+                )
+            )
+
+        results = run(
+            file_name,
+            args.palier,
+            60 if args.seg else 50,
+            args.courbes or charts.CHART_NAMES,
+            args.repetitions,
+            not args.sans_memoire,
+            folder,
+        )
+        results["fichier_mo"] = round(os.path.getsize(file_name) / 1e6, 1)
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(folder, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.comparer:
+        with open(args.comparer, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
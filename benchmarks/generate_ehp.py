@@ -0,0 +1,172 @@
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import charts  # noqa: E402
+import data_loader  # noqa: E402
+import gradients  # noqa: E402
+
+# Synthetic acquisition export of an EHP, in the format read by data_loader:
+# a 20 line header, then the Horodatage column and the channels of the palier
+#
+#   python benchmarks/generate_ehp.py ehp.csv --palier PQY --duree 24 --periode 1
+
+# Test profile, as (fraction of the duration, value): pressure rise to the
+# palier pressure, then to the test pressure, and back
+PRESSURE = [
+    (0.0, 2.0),
+    (0.15, 25.0),
+    (0.35, 172.0),
+    (0.45, 172.0),
+    (0.55, 207.2),
+    (0.65, 207.2),
+    (0.75, 172.0),
+    (0.9, 25.0),
+    (1.0, 2.0),
+]
+# Heating of the primary circuit, the metal follows the fluid with a delay
+TEMPERATURE = [
+    (0.0, 30.0),
+    (0.3, 90.0),
+    (0.7, 90.0),
+    (1.0, 35.0),
+]
+# Delay of the metal temperatures, as a fraction of the duration
+METAL_DELAY = 0.02
+
+
+def profile(points, fraction):
+    # Value and slope per unit of fraction of a piecewise linear profile
+    x, y = np.array(points).T
+    slopes = np.diff(y) / np.diff(x)
+    segment = np.clip(
+        np.searchsorted(x, fraction, side="right") - 1, 0, len(slopes) - 1
+    )
+    return np.interp(fraction, x, y), slopes[segment]
+
+
+def header_lines(palier, start, period):
+    lines = [
+        "Export acquisition EHP",
+        "Palier;%s" % palier,
+        "Debut;%s" % start.strftime("%d/%m/%Y %H:%M:%S"),
+        "Periode (s);%g" % period,
+        "Donnees synthetiques;generate_ehp.py",
+    ]
+    lines += ["" for _ in range(data_loader.HEADER_LINES - len(lines))]
+    return lines
+
+
+def channels(palier, extra, with_gradients):
+    columns = charts.required_columns(palier)
+    if not with_gradients:
+        columns = [column for column in columns if column not in gradients.GRADIENTS]
+    return columns + ["AUX%03d" % i for i in range(extra)]
+
+
+def block(columns, start, period, first, rows, total, rng):
+    # Lines first to first + rows of the acquisition
+    position = np.arange(first, first + rows)
+    fraction = position / max(total - 1, 1)
+    duration_s = period * max(total - 1, 1)
+    pressure, pressure_slope = profile(PRESSURE, fraction)
+    fluid, fluid_slope = profile(TEMPERATURE, fraction)
+    metal, metal_slope = profile(TEMPERATURE, np.maximum(fraction - METAL_DELAY, 0))
+
+    data = {}
+    for column in columns:
+        if column.endswith("MPGrad"):
+            # bar/min
+            values = pressure_slope / duration_s * 60 + rng.normal(0, 0.05, rows)
+        elif column.endswith("MTGrad") or column == "TGRAD":
+            # °C/h
+            values = metal_slope / duration_s * 3600 + rng.normal(0, 1.5, rows)
+        elif column.endswith("MP"):
+            values = pressure + rng.normal(0, 0.02, rows)
+        elif column.startswith("EHP") and column.endswith("MT"):
+            values = metal + rng.normal(0, 0.1, rows)
+        elif column.startswith("RCP") or column == "TMOY":
+            values = fluid + rng.normal(0, 0.1, rows)
+        else:
+            values = rng.normal(0, 1, rows)
+        data[column] = values
+
+    times = start + pd.to_timedelta(position * period, unit="s")
+    df = pd.DataFrame(data)
+    df.insert(0, data_loader.TIME_COLUMN, times.strftime(data_loader.TIME_FORMAT))
+    return df
+
+
+def generate(
+    output,
+    palier="900",
+    duration_h=24.0,
+    period=1.0,
+    extra=10,
+    with_gradients=True,
+    seed=0,
+    start="2023-03-01 08:00:00",
+    block_rows=200_000,
+):
+    # Written block by block, so the size of the file is not limited by memory
+    start = pd.Timestamp(start)
+    total = int(duration_h * 3600 / period) + 1
+    columns = channels(palier, extra, with_gradients)
+    rng = np.random.default_rng(seed)
+
+    with open(output, "w", encoding="utf-8", newline="") as f:
+        for line in header_lines(palier, start, period):
+            f.write(line + "\n")
+        for first in range(0, total, block_rows):
+            rows = min(block_rows, total - first)
+            df = block(columns, start, period, first, rows, total, rng)
+            df.to_csv(f, sep=";", index=False, header=first == 0, float_format="%.3f")
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Génère un fichier d'acquisition EHP synthétique"
+    )
+    parser.add_argument("sortie")
+    parser.add_argument("--palier", choices=["900", "PQY", "DPY"], default="900")
+    parser.add_argument("--duree", type=float, default=24.0, help="en heures")
+    parser.add_argument(
+        "--periode", type=float, default=1.0, help="entre deux lignes, en secondes"
+    )
+    parser.add_argument(
+        "--voies-supplementaires",
+        type=int,
+        default=10,
+        help="voies non tracées ajoutées au fichier",
+    )
+    parser.add_argument(
+        "--sans-gradients",
+        action="store_true",
+        help="sans les colonnes de gradient, calculées au chargement",
+    )
+    parser.add_argument("--graine", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rows = generate(
+        args.sortie,
+        args.palier,
+        args.duree,
+        args.periode,
+        args.voies_supplementaires,
+        not args.sans_gradients,
+        args.graine,
+    )
+    print(
+        "%s: %d lignes, %.1f Mo"
+        % (args.sortie, rows, os.path.getsize(args.sortie) / 1e6)
+    )
+
+
+if __name__ == "__main__":
+    main()
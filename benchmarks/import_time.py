@@ -0,0 +1,79 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# Import time of the GUI module, the time before the window can be shown, and
+# of the processing stack loaded after it. Each import is measured in a fresh
+# interpreter with -X importtime.
+#
+#   python benchmarks/import_time.py --max-ms 1500
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "main": "import main",
+    "heavy": "import main; main.heavy_imports()",
+}
+
+
+def import_times(code):
+    # (module, self µs, cumulative µs) of every module imported by code
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    times = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, module = line[len("import time:") :].split("|")
+        times.append((module.strip(), int(own), int(cumulative)))
+    return times
+
+
+def measure(code, runs):
+    # Best total over the runs, the first ones also pay the disk cache
+    best = None
+    for _ in range(runs):
+        times = import_times(code)
+        total = sum(own for _, own, _ in times)
+        if best is None or total < best[0]:
+            best = (total, times)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--max-ms", type=float, help="fails when main takes longer to import"
+    )
+    args = parser.parse_args(argv)
+
+    status = 0
+    for target, code in TARGETS.items():
+        total, times = measure(code, args.runs)
+        print("%s: %.0f ms" % (target, total / 1000))
+        # Top level packages only, their cumulative time includes submodules
+        packages = {}
+        for module, _, cumulative in times:
+            package = module.split(".")[0]
+            if module == package:
+                packages[package] = max(packages.get(package, 0), cumulative)
+        for package, cumulative in sorted(
+            packages.items(), key=lambda item: item[1], reverse=True
+        )[: args.top]:
+            print("    %-30s %8.1f ms" % (package, cumulative / 1000))
+        if target == "main" and args.max_ms and total / 1000 > args.max_ms:
+            print("main import is over %.0f ms" % args.max_ms)
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+import numpy as np
+from dateutil import tz
+from PySide6.QtCore import Qt, QDateTime, QTimer
+from PySide6.QtGui import QPainter
+from PySide6.QtCharts import (
+    QChart,
+    QChartView,
+    QDateTimeAxis,
+    QLineSeries,
+    QValueAxis,
+)
+import charts
+import data_loader
+import downsampling
+
+# Delay after the last zoom or pan before the visible range is decimated
+# again, in milliseconds
+REDRAW_DELAY = 30
+# Zoom factor of a mouse wheel step
+WHEEL_ZOOM = 1.25
+
+
+class ChartViewer(QChartView):
+    # Interactive view of a chart of charts.CHARTS drawn from the loaded data.
+    # Only the extremes of each pair of pixels of the visible range are drawn,
+    # so the view is decimated again after every zoom or pan.
+    #
+    # Drag to zoom on a time range, mouse wheel to zoom around the cursor,
+    # arrow keys to pan, right click to zoom out and double click to reset.
+    def __init__(self, parent=None):
+        self.plot = QChart()
+        super().__init__(self.plot, parent)
+        self.setRenderHint(QPainter.Antialiasing)
+        self.setRubberBand(QChartView.HorizontalRubberBand)
+        self.setFocusPolicy(Qt.StrongFocus)
+
+        self.redraw_timer = QTimer(self)
+        self.redraw_timer.setSingleShot(True)
+        self.redraw_timer.setInterval(REDRAW_DELAY)
+        self.redraw_timer.timeout.connect(self.redraw)
+
+        self.ehp_data = None
+        self.traces = []
+        self.key = None
+
+    def set_data(self, ehp_data, app_mode, seg):
+        # Data handed over by the loading worker. Its timestamps are parsed
+        # once, as local times since the axis expects milliseconds since the
+        # epoch.
+        times = data_loader.parse_time(ehp_data.index).tz_localize(
+            tz.tzlocal(), ambiguous="NaT", nonexistent="shift_forward"
+        )
+        self.ehp_data = ehp_data.set_axis(times)
+        self.app_mode = app_mode
+        self.seg = seg
+        self.key = None
+
+    def show_chart(self, name):
+        if self.ehp_data is None or self.key == name:
+            return
+        self.key = name
+        chart = charts.chart_definition(name, self.app_mode)
+        df = charts.chart_data(self.ehp_data, chart, self.seg)
+
+        milliseconds = df.index.asi8 / 1e6
+        known = ~np.asarray(df.index.isna())
+
+        # The axes are created again with the series, axes added to the
+        # chart before any series is attached are not laid out
+        self.plot.removeAllSeries()
+        for axis in self.plot.axes():
+            self.plot.removeAxis(axis)
+        self.x_axis = QDateTimeAxis()
+        self.x_axis.setFormat("dd/MM/yyyy HH:mm")
+        self.x_axis.setTitleText("Date")
+        self.y_axis = QValueAxis()
+        self.y_axis.setTitleText(chart["yaxis"])
+        self.plot.addAxis(self.x_axis, Qt.AlignBottom)
+        self.plot.addAxis(self.y_axis, Qt.AlignLeft)
+
+        self.traces = []
+        for column in df.columns:
+            values = df[column].to_numpy(dtype=np.float64)
+            valid = known & ~np.isnan(values)
+            series = QLineSeries()
+            series.setName(str(column))
+            self.plot.addSeries(series)
+            series.attachAxis(self.x_axis)
+            series.attachAxis(self.y_axis)
+            self.traces.append((series, milliseconds[valid], values[valid]))
+        self.plot.setTitle(chart["title"])
+        self.reset_zoom()
+        self.x_axis.rangeChanged.connect(lambda *_: self.redraw_timer.start())
+
+    def full_range(self):
+        starts = [x[0] for _, x, _ in self.traces if len(x)]
+        ends = [x[-1] for _, x, _ in self.traces if len(x)]
+        if not starts:
+            return None
+        return min(starts), max(ends)
+
+    def reset_zoom(self):
+        full = self.full_range()
+        if full is None:
+            for series, _, _ in self.traces:
+                series.clear()
+            return
+        self.set_range(*full)
+        self.redraw()
+
+    def set_range(self, start, end):
+        if end <= start:
+            end = start + 1000
+        self.x_axis.setRange(
+            QDateTime.fromMSecsSinceEpoch(int(start)),
+            QDateTime.fromMSecsSinceEpoch(int(end)),
+        )
+
+    def visible_range(self):
+        return (
+            self.x_axis.min().toMSecsSinceEpoch(),
+            self.x_axis.max().toMSecsSinceEpoch(),
+        )
+
+    def redraw(self):
+        # Extremes of the visible samples of each trace, plus the samples just
+        # outside so the lines reach the edges
+        if not self.traces:
+            return
+        start, end = self.visible_range()
+        buckets = max(1, self.viewport().width() // 2)
+        low, high = np.inf, -np.inf
+        for series, x, y in self.traces:
+            first = max(np.searchsorted(x, start, side="left") - 1, 0)
+            last = min(np.searchsorted(x, end, side="right") + 1, len(x))
+            x, y = x[first:last], y[first:last]
+            if len(x) == 0:
+                series.clear()
+                continue
+            positions = downsampling.decimate_positions(y, buckets)
+            series.replaceNp(
+                np.ascontiguousarray(x[positions]), np.ascontiguousarray(y[positions])
+            )
+            low = min(low, y.min())
+            high = max(high, y.max())
+
+        if low <= high:
+            margin = (high - low) * 0.05 or 1
+            self.y_axis.setRange(low - margin, high + margin)
+
+    def zoom(self, factor, center=None):
+        start, end = self.visible_range()
+        if center is None:
+            center = (start + end) / 2
+        self.set_range(
+            center - (center - start) / factor, center + (end - center) / factor
+        )
+
+    def wheelEvent(self, event):
+        position = self.plot.mapToValue(
+            self.plot.mapFromScene(self.mapToScene(event.position().toPoint()))
+        )
+        factor = WHEEL_ZOOM if event.angleDelta().y() > 0 else 1 / WHEEL_ZOOM
+        self.zoom(factor, position.x())
+
+    def mouseDoubleClickEvent(self, event):
+        self.reset_zoom()
+
+    def keyPressEvent(self, event):
+        steps = {Qt.Key_Left: -0.2, Qt.Key_Right: 0.2}
+        if event.key() in steps:
+            start, end = self.visible_range()
+            shift = (end - start) * steps[event.key()]
+            self.set_range(start + shift, end + shift)
+        elif event.key() == Qt.Key_Plus:
+            self.zoom(WHEEL_ZOOM)
+        elif event.key() == Qt.Key_Minus:
+            self.zoom(1 / WHEEL_ZOOM)
+        else:
+            super().keyPressEvent(event)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.redraw_timer.start()
@@ -0,0 +1,422 @@
+# Declaration of every chart of the report, in the order of the report.
+# "paliers" holds the values overridden for a given palier, "thresholds" the
+# constant lines drawn with their legend, and "names" the legend of the data
+# columns when it differs from the channel name.
+CHARTS = [
+    {
+        "name": "rcp",
+        "label": "Evolution de la pression RCP pendant l'EHP",
+        "title": "Evolution de la pression RCP pendant l'EHP",
+        "columns": ["EHP001MP", "EHP002MP"],
+        "yaxis": "Pression (bar)",
+    },
+    {
+        "name": "pression_refoulement_mule",
+        "label": "Evolution de la pression de refoulement de la pompe de charge",
+        "columns": ["EHP003MP"],
+        "yaxis": "Pression (bar)",
+        "layout": "layout2",
+        "paliers": {
+            "900": {
+                "title": "Evolution de la pression de refoulement de la pompe RIS011PO",
+                "thresholds": {
+                    "Pression limite EHP003MP: 241bars": 241,
+                    "Seuil d'arrêt: RIS011PO 235.5bars": 235.5,
+                    "Seuil d'alarme haute pression refoulement: RIS011PO 230bars": 230,
+                },
+            },
+            "PQY": {
+                "title": "Evolution de la pression de refoulement de la pompe RCV191PO",
+                "thresholds": {
+                    "Pression limite EHP003MP: 244bars": 244,
+                    "Seuil d'arrêt: RCV191PO 239bars": 239,
+                    "Seuil d'alarme haute pression refoulement: RCV191PO 234bars": 234,
+                },
+            },
+            "DPY": {
+                "title": "Evolution de la pression de refoulement de la pompe RCV191PO",
+                "thresholds": {
+                    "Pression limite EHP003MP: 236bars": 236,
+                    "Seuil d'arrêt: RCV191PO 232bars": 232,
+                    "Seuil d'alarme haute pression refoulement: RCV191PO 228bars": 228,
+                },
+            },
+        },
+    },
+    {
+        "name": "pression_refoulement_mule_detail",
+        "label": "Evolution de la pression de refoulement de la pompe de charge - détail",
+        "columns": ["EHP003MP"],
+        "prepare": "above",
+        "seuil": 4,
+        "yaxis": "Pression (bar)",
+        "layout": "layout2",
+        "paliers": {
+            "900": {
+                "title": "Evolution de la pression de refoulement de la pompe RIS011PO pendant l'épreuve",
+                "thresholds": {
+                    "Pression limite EHP003MP: 241bars": 241,
+                    "Seuil d'arrêt: RIS011PO 235.5bars": 235.5,
+                    "Seuil d'alarme haute pression refoulement: RIS011PO 230bars": 230,
+                },
+            },
+            "PQY": {
+                "title": "Evolution de la pression de refoulement de la pompe RCV191PO pendant l'épreuve",
+                "thresholds": {
+                    "Pression limite EHP003MP: 244bars": 244,
+                    "Seuil d'arrêt: RCV191PO 239bars": 239,
+                    "Seuil d'alarme haute pression refoulement: RCV191PO 234bars": 234,
+                },
+            },
+            "DPY": {
+                "title": "Evolution de la pression de refoulement de la pompe RCV191PO pendant l'épreuve",
+                "thresholds": {
+                    "Pression limite EHP003MP: 236bars": 236,
+                    "Seuil d'arrêt: RCV191PO 232bars": 232,
+                    "Seuil d'alarme haute pression refoulement: RCV191PO 228bars": 228,
+                },
+            },
+        },
+    },
+    {
+        "name": "temperature_gros_composants_fond_de_cuve",
+        "label": "Température des gros composants du CPP - Fond de cuve",
+        "title": "Evolution de la temperature des gros composants - Fond de cuve",
+        "columns": ["EHP001MT", "EHP002MT", "EHP003MT", "EHP011MT"],
+        "yaxis": "Température °C",
+    },
+    {
+        "name": "temperature_gros_composants_brides_JEP",
+        "label": "Température des gros composants du CPP - couvercle et pressu",
+        "title": "Evolution de la temperature des gros composants ",
+        "columns": [
+            "EHP004MT",
+            "EHP005MT",
+            "EHP006MT",
+            "EHP012MT",
+            "EHP013MT",
+            "EHP014MT",
+        ],
+        "names": {
+            "EHP004MT": "EHP004MT - Bride de cuve",
+            "EHP005MT": "EHP005MT - Bride de couvercle",
+            "EHP006MT": "EHP006MT - JEP Pressu",
+            "EHP012MT": "EHP012MT - Bride de cuve",
+            "EHP013MT": "EHP013MT - Bride de couvercle",
+            "EHP014MT": "EHP014MT - JEP Pressu",
+        },
+        "yaxis": "Température °C",
+    },
+    {
+        "name": "temperature_gros_composants_gv",
+        "label": "Température des gros composants du CPP - GVs",
+        "title": "Evolution de la temperature des gros composants - GV",
+        "columns": [
+            "EHP007MT",
+            "EHP008MT",
+            "EHP009MT",
+            "EHP010MT",
+            "EHP015MT",
+            "EHP016MT",
+            "EHP017MT",
+            "EHP018MT",
+        ],
+        "names": {
+            "EHP007MT": "EHP007MT - GV1",
+            "EHP008MT": "EHP008MT - GV2",
+            "EHP009MT": "EHP009MT - GV3",
+            "EHP010MT": "EHP010MT - GV4",
+            "EHP015MT": "EHP015MT - GV1",
+            "EHP016MT": "EHP016MT - GV2",
+            "EHP017MT": "EHP017MT - GV3",
+            "EHP018MT": "EHP018MT - GV4",
+        },
+        "yaxis": "Température (°C)",
+        "paliers": {
+            "900": {
+                "title": "Evolution de la temperature des gros composants - GVs",
+                "columns": [
+                    "EHP007MT",
+                    "EHP008MT",
+                    "EHP009MT",
+                    "EHP015MT",
+                    "EHP016MT",
+                    "EHP017MT",
+                ],
+            },
+        },
+    },
+    {
+        "name": "gradients_de_pression",
+        "label": "Gradients de Pression de l'EHP",
+        "title": "Gradients de Pression de l'EHP",
+        "columns": ["EHP001MPGrad", "EHP002MPGrad"],
+        "thresholds": {
+            "Valeur Max Gradient (+4 bar/min)": 4,
+            "Valeur Min Gradient (-4 bar/min)": -4,
+        },
+        "yaxis": "Gradient de Pression (bar/min)",
+    },
+    {
+        "name": "Tmoy",
+        "label": "Suivi de la Tmoy de l'EHP",
+        "title": "Suivi de la Tmoy de l'EHP",
+        "columns": ["TMOY"],
+        "yaxis": "Température (°C)",
+    },
+    {
+        "name": "Tgrad",
+        "label": "Suivi du gradient de Tmoy de l'EHP",
+        "title": "Suivi du gradient de Tmoy de l'EHP",
+        "columns": ["TMOY", "TGRAD"],
+        "prepare": "tgrad",
+        "names": {
+            "Tmoymin": "Tmoymin -14°C/h & -28°C/h",
+            "Tmoymax": "Tmoymax +14°C/h & +28°C/h",
+        },
+        "yaxis": "Température (°C/h)",
+    },
+    {
+        "name": "Tfluide1",
+        "label": "Suivi des températures fluide pendant l'EHP - 1",
+        "title": "Suivi des températures fluide pendant l'EHP",
+        "columns": ["RCP009MT", "RCP010MT", "RCP028MT"],
+        "yaxis": "Température (°C)",
+        "paliers": {
+            "PQY": {
+                "names": {
+                    "RCP009MT": "RCP009MT",
+                    "RCP010MT": "RCP014MT",
+                    "RCP028MT": "RCP100MT",
+                },
+            },
+            "DPY": {
+                "names": {
+                    "RCP009MT": "RCP009MT",
+                    "RCP010MT": "RCP014MT",
+                    "RCP028MT": "RCP100MT",
+                },
+            },
+        },
+    },
+    {
+        "name": "Tfluide2",
+        "label": "Suivi des températures fluide pendant l'EHP - 2",
+        "title": "Suivi des températures fluide pendant l'EHP",
+        "columns": ["RCP029MT", "RCP043MT", "RCP044MT"],
+        "yaxis": "Température (°C)",
+        "paliers": {
+            "PQY": {
+                "names": {
+                    "RCP029MT": "RCP104MT",
+                    "RCP043MT": "RCP200MT",
+                    "RCP044MT": "RCP204MT",
+                },
+            },
+            "DPY": {
+                "names": {
+                    "RCP029MT": "RCP104MT",
+                    "RCP043MT": "RCP200MT",
+                    "RCP044MT": "RCP204MT",
+                },
+            },
+        },
+    },
+    {
+        "name": "Tfluide3",
+        "label": "Suivi des températures fluide pendant l'EHP - 3",
+        "title": "Suivi des températures fluide pendant l'EHP",
+        "columns": ["RCP055MT", "RCP056MT", "RCP400MT", "RCP404MT"],
+        "names": {
+            "RCP055MT": "RCP104MT",
+            "RCP056MT": "RCP200MT",
+            "RCP400MT": "RCP204MT",
+            "RCP404MT": "RCP404MT",
+        },
+        "yaxis": "Température (°C)",
+        "paliers": {
+            "900": {
+                "columns": ["RCP055MT", "RCP056MT"],
+                "names": {},
+            },
+        },
+    },
+    {
+        "name": "Tmetal1",
+        "label": "Gradient des températures métal pendant l'EHP - Fond de cuve",
+        "title": "Gradient des températures métal pendant l'EHP - Fond de cuve",
+        "columns": ["EHP001MT_EHP002MTGrad", "EHP011MT_EHP003MTGrad"],
+        "yaxis": "Température (°C/h)",
+    },
+    {
+        "name": "Tmetal2",
+        "label": "Gradient des températures métal pendant l'EHP - Couvercle et Pressu",
+        "title": "Gradient des températures métal pendant l'EHP - Couvercle et Pressu",
+        "columns": [
+            "EHP004MT_EHP012MTGrad",
+            "EHP013MT_EHP005MTGrad",
+            "EHP006MT_EHP014MTGrad",
+        ],
+        "names": {
+            "EHP004MT_EHP012MTGrad": "Max EHP004MTGrad/EHP012MTGrad - Bride de cuve",
+            "EHP013MT_EHP005MTGrad": "Max EHP005MTGrad/EHP013MTGrad - Bride de couvercle",
+            "EHP006MT_EHP014MTGrad": "Max EHP006MTGrad/EHP014MTGrad - JEP Pressu",
+        },
+        "yaxis": "Température (°C/h)",
+    },
+    {
+        "name": "Tmetal3",
+        "label": "Gradient des températures métal pendant l'EHP - GV",
+        "title": "Gradient des températures métal pendant l'EHP - GV",
+        "columns": [
+            "EHP007MT_EHP015MTGrad",
+            "EHP008MT_EHP016MTGrad",
+            "EHP017MT_EHP009MTGrad",
+            "EHP018MT_EHP010MTGrad",
+        ],
+        "names": {
+            "EHP007MT_EHP015MTGrad": "Max EHP007MTGrad/EHP015MTGrad - GV1",
+            "EHP008MT_EHP016MTGrad": "Max EHP008MTGrad/EHP016MTGrad - GV2",
+            "EHP017MT_EHP009MTGrad": "Max EHP009MTGrad/EHP017MTGrad - GV3",
+            "EHP018MT_EHP010MTGrad": "Max EHP010MTGrad/EHP018MTGrad - GV4",
+        },
+        "yaxis": "Température (°C/h)",
+        "paliers": {
+            "900": {
+                "columns": [
+                    "EHP007MT_EHP015MTGrad",
+                    "EHP008MT_EHP016MTGrad",
+                    "EHP017MT_EHP009MTGrad",
+                ],
+            },
+        },
+    },
+    {
+        "name": "P_primaire_epreuve",
+        "label": "Evolution de la pression pendant le palier d'épreuve",
+        "title": "Evolution de la pression primaire pendant l'épreuve",
+        "columns": ["EHP001MP", "EHP002MP"],
+        "prepare": "pression_epreuve",
+        "seuil": 172,
+        "thresholds": {
+            "207,8 bar": 207.8,
+            "206,9 bar": 206.9,
+        },
+        "yaxis": "Pression (bar)",
+    },
+    {
+        "name": "P_primaire_palier",
+        "label": "Evolution de la pression pendant le palier d'épreuve - détail",
+        "title": "Evolution de la pression primaire pendant le palier d'épreuve",
+        "columns": ["EHP001MP", "EHP002MP"],
+        "prepare": "pression_epreuve",
+        "seuil": 205,
+        "thresholds": {
+            "206,9 bar": 206.9,
+            "206 bar": 206,
+        },
+        "yaxis": "Pression (bar)",
+    },
+]
+
+# Limits of the hors critères export: name of the criteria, channel, limit in
+# the unit of the channel, and the side of the carbon segregation temperature
+# (TMOY against seg) where it applies, None for always. Each limit gives an
+# "_inf-" criterion below its opposite and a "_sup" criterion above it.
+HORS_CRITERES = [
+    ("EHP1MPGrad", "EHP001MPGrad", 4, None),
+    ("EHP2MPGrad", "EHP002MPGrad", 4, None),
+    ("TGRAD", "TGRAD", 28, "above"),
+    ("TGRAD", "TGRAD", 14, "below"),
+]
+
+# The procedure gives no limit for the metal gradients drawn by Tmetal1, 2 and
+# 3, they are only checked when limits are declared here, as (below seg,
+# above seg) in °C/h
+METAL_GRADIENT_LIMITS = None
+
+# Channels read by hors_criteres, besides the metal gradients of the palier
+HORS_CRITERES_COLUMNS = list(
+    dict.fromkeys(["TMOY"] + [column for _, column, _, _ in HORS_CRITERES])
+)
+
+CHART_NAMES = [chart["name"] for chart in CHARTS]
+
+
+def chart_definition(name, app_mode):
+    # Declaration of a chart with the values of the palier applied
+    chart = CHARTS[CHART_NAMES.index(name)]
+    chart = {**chart, **chart.get("paliers", {}).get(app_mode, {})}
+    chart.pop("paliers", None)
+    return chart
+
+
+def metal_gradient_columns(app_mode):
+    return [
+        column
+        for name in ["Tmetal1", "Tmetal2", "Tmetal3"]
+        for column in chart_definition(name, app_mode)["columns"]
+    ]
+
+
+def required_columns(app_mode, names=None, hors_criteres=True):
+    # Union of the channels the selected charts of the palier read
+    if names is None:
+        names = CHART_NAMES
+    columns = []
+    for name in names:
+        columns += chart_definition(name, app_mode)["columns"]
+    if hors_criteres:
+        columns += HORS_CRITERES_COLUMNS
+        if METAL_GRADIENT_LIMITS is not None:
+            columns += metal_gradient_columns(app_mode)
+    return list(dict.fromkeys(columns))
+
+
+def _above(ehp_data, chart, seg):
+    df = ehp_data.loc[ehp_data[chart["columns"][0]] > chart["seuil"]]
+    return df[chart["columns"]]
+
+
+def _tgrad(ehp_data, chart, seg):
+    TmoySup = 28
+    TmoyInf = -28
+
+    df = ehp_data[["TMOY", "TGRAD"]]
+    df = df.assign(Tmoymin=-14)
+    df = df.assign(Tmoymax=14)
+    df.loc[df.TMOY > seg, "Tmoymax"] = TmoySup
+    df.loc[df.TMOY > seg, "Tmoymin"] = TmoyInf
+    return df[["TGRAD", "Tmoymax", "Tmoymin"]]
+
+
+def _pression_epreuve(ehp_data, chart, seg):
+    # pandas is imported here so that the GUI reads the registry at startup
+    # without loading it
+    import pandas as pd
+
+    df = ehp_data.loc[ehp_data["EHP001MP"] > chart["seuil"]]
+    df = df[["EHP001MP"]]
+    df2 = ehp_data.loc[ehp_data["EHP002MP"] > chart["seuil"]]
+    df2 = df2[["EHP002MP"]]
+    df = pd.concat([df, df2])
+    df = df.sort_index()
+    df = df.interpolate()
+    return df
+
+
+PREPARE = {
+    "above": _above,
+    "tgrad": _tgrad,
+    "pression_epreuve": _pression_epreuve,
+}
+
+
+def chart_data(ehp_data, chart, seg=50):
+    # Frame plotted by a chart, one column per trace named by its legend
+    if "prepare" in chart:
+        df = PREPARE[chart["prepare"]](ehp_data, chart, seg)
+    else:
+        df = ehp_data[chart["columns"]]
+    df = df.assign(**chart.get("thresholds", {}))
+    return df.rename(columns=chart.get("names", {}))
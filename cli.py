@@ -0,0 +1,185 @@
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import charts
+import data_loader
+import ehp_functions as ehp
+import instrumentation
+import pipeline
+from scheduler import PriorityScheduler
+
+# Headless batch generation of the reports of many acquisition files, without
+# Qt. The files are loaded in parallel threads and all their charts share the
+# same process pool.
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Génère les courbes, documents Word et hors critères "
+        "de fichiers d'acquisition EHP"
+    )
+    parser.add_argument("fichiers", nargs="+", help="fichiers CSV d'acquisition")
+    parser.add_argument("--palier", choices=["900", "PQY", "DPY"], default="900")
+    parser.add_argument("--pee", default="", help="PEE et site/arrêt des documents")
+    parser.add_argument(
+        "--seg", action="store_true", help="ségrégation carbone (seuil à 60 °C)"
+    )
+    parser.add_argument(
+        "--courbes",
+        nargs="+",
+        choices=charts.CHART_NAMES,
+        help="courbes à générer, toutes par défaut",
+    )
+    parser.add_argument(
+        "--sans-hors-criteres",
+        action="store_true",
+        help="ne pas exporter les hors critères",
+    )
+    parser.add_argument(
+        "--format-hors-criteres",
+        choices=ehp.EXPORT_FORMATS,
+        default="xlsx",
+        help="classeur d'une feuille par critère, ou table CSV unique",
+    )
+    parser.add_argument(
+        "--rapport-unique",
+        action="store_true",
+        help="un seul document Word pour toutes les courbes",
+    )
+    parser.add_argument(
+        "--resume-hors-criteres",
+        action="store_true",
+        help="ajoute le nombre de hors critères à la fin du rapport unique",
+    )
+    parser.add_argument(
+        "--template",
+        default=ehp.TEMPLATE,
+        help="modèle Word des documents, celui de l'application par défaut",
+    )
+    parser.add_argument(
+        "--sortie",
+        default="rapports",
+        help="dossier de sortie, un sous-dossier par fichier",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=pipeline.worker_count(render=False),
+        help="nombre de processus de tracé, selon les cœurs et la mémoire "
+        "libre par défaut",
+    )
+    parser.add_argument(
+        "--fichiers-paralleles",
+        type=int,
+        default=2,
+        help="nombre de fichiers chargés en même temps",
+    )
+    parser.add_argument(
+        "--resume", help="fichier JSON du résumé, sur la sortie standard par défaut"
+    )
+    return parser.parse_args(argv)
+
+
+def output_folder(sortie, file_name, file_names):
+    # One folder per file, named after it; the folder name is prefixed by its
+    # position when two files have the same name
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    stems = [os.path.splitext(os.path.basename(name))[0] for name in file_names]
+    if stems.count(stem) > 1:
+        stem = "%d_%s" % (file_names.index(file_name), stem)
+    return os.path.join(sortie, stem)
+
+
+def run_file(executor, args, file_name, folder):
+    start = time.perf_counter()
+    result = {"fichier": file_name, "sortie": folder}
+    try:
+        chart_names = args.courbes or charts.CHART_NAMES
+        hors_criteres = not args.sans_hors_criteres
+        columns = charts.required_columns(args.palier, chart_names, hors_criteres)
+        with instrumentation.stage("load", file=file_name):
+            ehp_data = data_loader.load_data(file_name, columns)
+
+        # Its own scheduler, on the process pool shared by all the files
+        scheduler = PriorityScheduler(executor, args.workers)
+        summary = pipeline.process(
+            scheduler,
+            ehp_data,
+            args.palier,
+            args.pee,
+            60 if args.seg else 50,
+            chart_names,
+            hors_criteres,
+            folder,
+            render=False,
+            report=args.rapport_unique,
+            report_summary=args.resume_hors_criteres,
+            export_format=args.format_hors_criteres,
+            template=args.template,
+        )
+        result.update(
+            statut="ok",
+            lignes=len(ehp_data),
+            courbes=[name for name in chart_names if name in summary["charts"]],
+            hors_criteres=summary["hors_criteres"],
+            trace=summary["trace"],
+        )
+    except Exception as error:
+        result.update(statut="erreur", erreur="%s: %s" % (type(error).__name__, error))
+    result["duree_s"] = round(time.perf_counter() - start, 3)
+    print(
+        "%s: %s (%.1f s)" % (file_name, result["statut"], result["duree_s"]),
+        file=sys.stderr,
+    )
+    return result
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    start = time.perf_counter()
+
+    # Without the render service, the Kaleido of each worker stays warm for
+    # the whole batch. The workers start while the first files are loaded.
+    pool = pipeline.WorkerPool(args.workers, render=False)
+    executor = pool.get()
+    threading.Thread(target=pool.warm, daemon=True).start()
+    try:
+        with ThreadPoolExecutor(max_workers=args.fichiers_paralleles) as files:
+            results = list(
+                files.map(
+                    lambda file_name: run_file(
+                        executor,
+                        args,
+                        file_name,
+                        output_folder(args.sortie, file_name, args.fichiers),
+                    ),
+                    args.fichiers,
+                )
+            )
+    finally:
+        pool.shutdown(wait=True)
+
+    summary = {
+        "palier": args.palier,
+        "pee": args.pee,
+        "seg": 60 if args.seg else 50,
+        "duree_s": round(time.perf_counter() - start, 3),
+        "fichiers": results,
+    }
+    text = json.dumps(summary, ensure_ascii=False, indent=2)
+    if args.resume:
+        with open(args.resume, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0 if all(result["statut"] == "ok" for result in results) else 1
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
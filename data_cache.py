@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import threading
+import numpy as np
+import pandas as pd
+
+# Parsed acquisitions are kept as one .npy file per column, so that a rerun
+# only has to memory-map them instead of parsing the CSV again
+CACHE_FOLDER = "cache_csv"
+MAX_SIZE = 2 * 1024**3
+MAX_AGE = 7 * 24 * 3600
+
+META_FILE = "meta.json"
+INDEX_FILE = "index.npy"
+
+
+def cache_folder_path():
+    return os.path.join(os.getcwd(), CACHE_FOLDER)
+
+
+def file_key(file_name, *params):
+    # Content hash + size of the CSV, plus the parsing parameters
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_name, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    digest.update(repr(params).encode())
+    size = os.path.getsize(file_name)
+    return str(size) + "_" + digest.hexdigest()
+
+
+def entry_key(key, columns):
+    # Entries of the same file and parameters differ by their set of columns
+    digest = hashlib.blake2b(repr(sorted(columns)).encode(), digest_size=8)
+    return key + "_" + digest.hexdigest()
+
+
+def _read_meta(entry_path):
+    try:
+        with open(os.path.join(entry_path, META_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load(key, columns):
+    # Any entry of the file holding all the columns will do: a run on a subset
+    # of the charts reads its columns from the entry of the whole palier
+    cache_path = cache_folder_path()
+    if not os.path.exists(cache_path):
+        return None
+
+    wanted = set(columns)
+    for name in os.listdir(cache_path):
+        if not name.startswith(key + "_") or ".tmp" in name:
+            continue
+        entry_path = os.path.join(cache_path, name)
+        meta = _read_meta(entry_path)
+        if meta is None or not wanted <= {column for column, _ in meta["columns"]}:
+            continue
+        ehp_data = _load_entry(entry_path, meta, wanted)
+        if ehp_data is not None:
+            return ehp_data
+    return None
+
+
+def _load_entry(entry_path, meta, wanted):
+    try:
+        index = np.load(os.path.join(entry_path, INDEX_FILE), mmap_mode="r")
+        columns = {
+            column: np.load(os.path.join(entry_path, file), mmap_mode="r")
+            for column, file in meta["columns"]
+            if column in wanted
+        }
+    except (OSError, ValueError, KeyError):
+        # Unreadable entry, it is parsed again and overwritten
+        return None
+
+    # Mark the entry as recently used for the eviction
+    os.utime(entry_path)
+
+    # Without copy every column stays its own block on its memory map,
+    # instead of being merged into one block in memory
+    return pd.DataFrame(
+        columns,
+        index=pd.Index(index, name=meta["index_name"]),
+        copy=False,
+    )
+
+
+def store(key, ehp_data):
+    cache_path = cache_folder_path()
+    key = entry_key(key, ehp_data.columns)
+    if not os.path.exists(cache_path):
+        os.mkdir(cache_path)
+
+    # Write into a temporary folder and rename it, so that a concurrent run
+    # never sees a half written entry
+    entry_path = os.path.join(cache_path, key)
+    tmp_path = "%s.tmp%d_%d" % (entry_path, os.getpid(), threading.get_ident())
+    os.mkdir(tmp_path)
+
+    columns = []
+    for position, column in enumerate(ehp_data.columns):
+        file = str(position) + ".npy"
+        np.save(os.path.join(tmp_path, file), ehp_data[column].to_numpy())
+        columns.append((column, file))
+
+    index = ehp_data.index.to_numpy()
+    if index.dtype == object:
+        index = index.astype(str)
+    np.save(os.path.join(tmp_path, INDEX_FILE), index)
+
+    with open(os.path.join(tmp_path, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"columns": columns, "index_name": ehp_data.index.name}, f)
+
+    try:
+        os.replace(tmp_path, entry_path)
+    except OSError:
+        # Entry already written by another run
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    evict()
+
+
+def evict(max_size=MAX_SIZE, max_age=MAX_AGE):
+    cache_path = cache_folder_path()
+    if not os.path.exists(cache_path):
+        return
+
+    entries = []
+    for name in os.listdir(cache_path):
+        entry_path = os.path.join(cache_path, name)
+        if not os.path.isdir(entry_path):
+            continue
+        size = sum(
+            os.path.getsize(os.path.join(entry_path, file))
+            for file in os.listdir(entry_path)
+        )
+        entries.append((os.path.getmtime(entry_path), size, entry_path))
+
+    # Oldest entries go first, until the cache is small enough
+    entries.sort()
+    total_size = sum(size for _, size, _ in entries)
+    now = time.time()
+    for mtime, size, entry_path in entries:
+        if now - mtime <= max_age and total_size <= max_size:
+            break
+        shutil.rmtree(entry_path, ignore_errors=True)
+        total_size -= size
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+import data_cache
+import gradients
+
+# Number of lines written by the acquisition system before the column names
+HEADER_LINES = 20
+
+# Timestamp column of the acquisition export and its format, day first
+TIME_COLUMN = "Horodatage"
+TIME_FORMAT = "%d/%m/%Y %H:%M:%S"
+
+# Type of the channels: the pressures and temperatures of the export have at
+# most three decimals, which a float32 keeps at the values they reach
+CHANNEL_DTYPE = np.float32
+
+# Decimals of the channels in the export. The values that leave the program,
+# in the charts and the excursions, are rounded back to them in float64 so
+# that a CSV value of 105.098 is not written as 105.0979995727539
+DECIMALS = 3
+
+# Part of the cache key, changes with the types or the computation of the
+# parsed frame
+SCHEMA_VERSION = 3
+
+
+def parse_time(index):
+    # Timestamps of the acquisition, parsed with the format of the export and
+    # inferred, still day first, if some of them do not follow it
+    if pd.api.types.is_datetime64_any_dtype(index):
+        return index
+    try:
+        return pd.to_datetime(index, format=TIME_FORMAT)
+    except ValueError:
+        return pd.to_datetime(index, dayfirst=True)
+
+
+def export_values(values):
+    return np.round(np.asarray(values, dtype=np.float64), DECIMALS)
+
+
+def channel_dtypes(usecols):
+    # Types given to read_csv, the timestamps are parsed once per chunk
+    return {column: CHANNEL_DTYPE for column in usecols if column != TIME_COLUMN}
+
+
+def plan_columns(header, columns):
+    # Columns to parse from an export whose column names are `header`:
+    # gradient columns it lacks are computed from their raw channels. The
+    # export is rejected before parsing when a column cannot be found or
+    # computed.
+    header = list(header)
+    missing = []
+    for column in [TIME_COLUMN] + list(columns):
+        if column in header:
+            continue
+        if column in gradients.GRADIENTS and all(
+            source in header for source in gradients.source_columns([column])
+        ):
+            continue
+        missing.append(column)
+    if missing:
+        raise ValueError("Missing columns in the export: " + ", ".join(missing))
+
+    computed = [
+        column
+        for column in columns
+        if column not in header and column in gradients.GRADIENTS
+    ]
+    raw = [
+        column for column in gradients.source_columns(computed) if column not in columns
+    ]
+    usecols = [TIME_COLUMN] + [c for c in columns if c not in computed] + raw
+    return usecols, computed, raw
+
+
+def prepare_chunk(chunk, computed, raw, window=None, history=None):
+    # Index a parsed chunk by its timestamps and add the computed gradients,
+    # `history` carries the end of the previous chunk for them
+    times = parse_time(chunk.pop(TIME_COLUMN))
+    chunk.index = pd.DatetimeIndex(times, name="index")
+    if computed:
+        chunk_gradients, history = gradients.compute_gradients(
+            chunk, computed, window, history
+        )
+        chunk_gradients = chunk_gradients.astype(CHANNEL_DTYPE)
+        chunk = pd.concat([chunk.drop(columns=raw), chunk_gradients], axis=1)
+    return chunk, history
+
+
+def load_data(
+    file_name, columns, step=1, chunksize=100_000, use_cache=True, window=None
+):
+    # A file already parsed with the same parameters is read back from the
+    # cache, from any entry holding the columns
+    if use_cache:
+        key = data_cache.file_key(file_name, step, window, SCHEMA_VERSION)
+        ehp_data = data_cache.load(key, columns)
+        if ehp_data is not None:
+            return ehp_data
+
+    # Only parse the channels the charts need, gradient columns missing from
+    # the export are computed at full rate before the decimation
+    header = pd.read_csv(file_name, sep=";", skiprows=HEADER_LINES, nrows=0)
+    usecols, computed, raw = plan_columns(header.columns, columns)
+
+    # Skip the export header and keep one data line out of `step` while parsing,
+    # so the dropped lines are never converted
+    def skip_line(line):
+        if line < HEADER_LINES:
+            return True
+        if line == HEADER_LINES or computed:
+            return False
+        return (line - HEADER_LINES - 1) % step != 0
+
+    # Read by chunks so that at most one chunk of raw lines is held in memory
+    chunks = pd.read_csv(
+        file_name,
+        sep=";",
+        skiprows=skip_line,
+        usecols=usecols,
+        dtype=channel_dtypes(usecols),
+        chunksize=chunksize,
+    )
+
+    frames = []
+    history = None
+    position = 0
+    for chunk in chunks:
+        chunk, history = prepare_chunk(chunk, computed, raw, window, history)
+        if computed:
+            kept = (np.arange(position, position + len(chunk)) % step) == 0
+            position += len(chunk)
+            chunk = chunk[kept]
+        frames.append(chunk)
+    ehp_data = pd.concat(frames)
+
+    if use_cache:
+        data_cache.store(key, ehp_data)
+    return ehp_data
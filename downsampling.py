@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+
+def peak_positions(values, buckets):
+    # Positions of the minimum and maximum of each bucket, NaN are ignored
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    size = -(-n // buckets)
+    count = -(-n // size)
+
+    padded = np.full(size * count, np.nan)
+    padded[:n] = values
+    padded = padded.reshape(count, size)
+    missing = np.isnan(padded)
+
+    starts = np.arange(count) * size
+    low = starts + np.where(missing, np.inf, padded).argmin(axis=1)
+    high = starts + np.where(missing, -np.inf, padded).argmax(axis=1)
+    return np.minimum(np.concatenate((low, high)), n - 1)
+
+
+def decimate_positions(values, buckets):
+    # Sorted positions of the samples kept to draw a trace on `buckets` pixels:
+    # its extremes over each slice of the rows, so no peak is lost
+    n = len(values)
+    if n <= 2 * buckets:
+        return np.arange(n)
+    if np.nanmin(values) == np.nanmax(values):
+        # Constant line, such as a threshold
+        return np.array([0, n - 1])
+    positions = np.concatenate(([0, n - 1], peak_positions(values, buckets)))
+    return np.unique(positions)
+
+
+def decimate(df, buckets):
+    # Long format frame (index, variable, value) of the columns of df, each
+    # trace keeping only its own extremes
+    frames = []
+    for column in df.columns:
+        values = df[column].to_numpy()
+        positions = decimate_positions(values, buckets)
+        frames.append(
+            pd.DataFrame(
+                {
+                    "index": df.index[positions],
+                    "variable": column,
+                    "value": values[positions],
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import data_loader
+
+COLUMNS = ["debut", "fin", "duree_s", "nb_points", "valeur_pic", "heure_pic"]
+
+
+def intervals(mask, values, times):
+    # Turn a boolean mask into its contiguous runs of True, with the sample
+    # of largest magnitude of each run as its peak
+    mask = np.asarray(mask, dtype=bool)
+    values = np.asarray(values)
+    times = np.asarray(times, dtype="datetime64[ns]")
+
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    if len(starts) == 0:
+        return pd.DataFrame(columns=COLUMNS)
+
+    # Sort the samples of each run by decreasing magnitude, the first one of
+    # each run is its peak
+    positions = np.flatnonzero(mask)
+    run = np.repeat(np.arange(len(starts)), ends - starts + 1)
+    order = np.lexsort((-np.abs(values[positions]), run))
+    first = np.concatenate(([0], np.cumsum(ends - starts + 1)[:-1]))
+    peaks = positions[order[first]]
+
+    return pd.DataFrame(
+        {
+            "debut": times[starts],
+            "fin": times[ends],
+            "duree_s": (times[ends] - times[starts]) / np.timedelta64(1, "s"),
+            "nb_points": ends - starts + 1,
+            "valeur_pic": data_loader.export_values(values[peaks]),
+            "heure_pic": times[peaks],
+        }
+    )
+
+
+def merge(previous, new, continued):
+    # Intervals of a criterion over data read in two parts. When the previous
+    # part ended inside an excursion and the new part starts inside it
+    # (`continued`), its two halves are one excursion.
+    if len(previous) == 0:
+        return new
+    if len(new) == 0:
+        return previous
+    if not continued:
+        return pd.concat([previous, new], ignore_index=True)
+
+    last = previous.iloc[-1]
+    first = new.iloc[0]
+    peak = last if abs(last["valeur_pic"]) >= abs(first["valeur_pic"]) else first
+    joined = pd.DataFrame(
+        {
+            "debut": [last["debut"]],
+            "fin": [first["fin"]],
+            "duree_s": [(first["fin"] - last["debut"]) / pd.Timedelta(1, "s")],
+            "nb_points": [last["nb_points"] + first["nb_points"]],
+            "valeur_pic": [peak["valeur_pic"]],
+            "heure_pic": [peak["heure_pic"]],
+        }
+    )
+    return pd.concat([previous.iloc[:-1], joined, new.iloc[1:]], ignore_index=True)
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import data_loader
+
+# Gradient columns of the acquisition export and how to compute them from the
+# raw channels: source channels (the largest gradient in magnitude is kept for
+# a pair), seconds per unit of time (bar/min, °C/h) and default window in
+# seconds
+GRADIENTS = {
+    "EHP001MPGrad": (["EHP001MP"], 60, 60),
+    "EHP002MPGrad": (["EHP002MP"], 60, 60),
+    "TGRAD": (["TMOY"], 3600, 600),
+    "EHP001MT_EHP002MTGrad": (["EHP001MT", "EHP002MT"], 3600, 600),
+    "EHP011MT_EHP003MTGrad": (["EHP011MT", "EHP003MT"], 3600, 600),
+    "EHP004MT_EHP012MTGrad": (["EHP004MT", "EHP012MT"], 3600, 600),
+    "EHP013MT_EHP005MTGrad": (["EHP013MT", "EHP005MT"], 3600, 600),
+    "EHP006MT_EHP014MTGrad": (["EHP006MT", "EHP014MT"], 3600, 600),
+    "EHP007MT_EHP015MTGrad": (["EHP007MT", "EHP015MT"], 3600, 600),
+    "EHP008MT_EHP016MTGrad": (["EHP008MT", "EHP016MT"], 3600, 600),
+    "EHP017MT_EHP009MTGrad": (["EHP017MT", "EHP009MT"], 3600, 600),
+    "EHP018MT_EHP010MTGrad": (["EHP018MT", "EHP010MT"], 3600, 600),
+}
+
+
+def source_columns(names):
+    columns = []
+    for name in names:
+        columns += GRADIENTS[name][0]
+    return list(dict.fromkeys(columns))
+
+
+def rolling_slope(values, seconds, window):
+    # Slope between each sample and the first sample of the window ending at
+    # it, per second, using the actual timestamps. `seconds` counts from the
+    # first sample of the file: until a full window has elapsed, the slope
+    # over the few seconds available would mostly be sensor noise.
+    start = np.searchsorted(seconds, seconds - window, side="left")
+    elapsed = seconds - seconds[start]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (values - values[start]) / elapsed
+    slope[(elapsed == 0) | (seconds < window)] = np.nan
+    return slope
+
+
+def compute_gradients(df, names, window=None, history=None):
+    # Gradient columns `names` of df computed from its raw channels. Chunks
+    # of a file are processed one after the other by passing back the
+    # returned history: the samples of the previous chunk still inside the
+    # window, and the time of the first sample of the file.
+    sources = source_columns(names)
+    raw = df[sources]
+    if history is not None:
+        previous, first = history
+        raw = pd.concat([previous, raw])
+
+    times = data_loader.parse_time(raw.index).to_numpy(dtype="datetime64[ns]")
+    if history is None:
+        first = times[0]
+    seconds = (times - first) / np.timedelta64(1, "s")
+
+    gradients = {}
+    for name in names:
+        channels, unit, default_window = GRADIENTS[name]
+        slopes = [
+            rolling_slope(
+                raw[channel].to_numpy(dtype=np.float64),
+                seconds,
+                window or default_window,
+            )
+            * unit
+            for channel in channels
+        ]
+        gradient = slopes[0]
+        for slope in slopes[1:]:
+            larger = (np.abs(slope) > np.abs(gradient)) | np.isnan(gradient)
+            gradient = np.where(larger, slope, gradient)
+        gradients[name] = gradient[len(raw) - len(df) :]
+
+    # Keep what the next chunk needs, the samples inside the longest window
+    longest = max(window or GRADIENTS[name][2] for name in names)
+    history = (raw.iloc[np.searchsorted(seconds, seconds[-1] - longest) :], first)
+
+    return pd.DataFrame(gradients, index=df.index), history
@@ -0,0 +1,161 @@
+import contextlib
+import json
+import os
+import threading
+import time
+
+# Wall time, CPU time and memory of the stages of a run. Each thread, in the
+# GUI, the command line or a worker process, records its own stages; a task
+# returns the records of its stages with its result. The memory of a stage is
+# the resident memory of its process when it ends and how much it grew during
+# the stage, with the peak resident memory of the process by the end of the
+# stage; the threads of a process share them.
+#
+# The records are written as a Chrome trace (chrome://tracing, Perfetto), one
+# line per worker process.
+
+TRACE_FILE = "trace_ehp.json"
+
+_local = threading.local()
+
+
+def rss():
+    # Resident memory of the process now, in bytes
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return _windows_rss()
+    # No current value on macOS, the peak since the process started grows
+    # with the stages that need more memory than the previous ones
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def peak_rss():
+    # Highest resident memory of the process since it started, in bytes
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return _windows_rss(peak=True)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def _windows_rss(peak=False):
+    import ctypes
+    from ctypes import wintypes
+
+    class Counters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = Counters()
+    counters.cb = ctypes.sizeof(Counters)
+    ctypes.windll.psapi.GetProcessMemoryInfo(
+        ctypes.windll.kernel32.GetCurrentProcess(),
+        ctypes.byref(counters),
+        counters.cb,
+    )
+    return counters.PeakWorkingSetSize if peak else counters.WorkingSetSize
+
+
+def _records():
+    if not hasattr(_local, "records"):
+        _local.records = []
+    return _local.records
+
+
+@contextlib.contextmanager
+def stage(name, **args):
+    # Record the stage run by the with block, stages may be nested
+    start = time.time()
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    memory = rss()
+    try:
+        yield
+    finally:
+        end_memory = rss()
+        _records().append(
+            {
+                "name": name,
+                "start": start,
+                "wall_s": time.perf_counter() - wall,
+                "cpu_s": time.thread_time() - cpu,
+                "rss_mo": round(end_memory / 1e6, 1),
+                "rss_delta_mo": round((end_memory - memory) / 1e6, 1),
+                "rss_peak_mo": round(peak_rss() / 1e6, 1),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": args,
+            }
+        )
+
+
+def collect():
+    # Records of this thread since the previous call
+    records = _records()
+    _local.records = []
+    return records
+
+
+def run_task(name, func, *args):
+    # Task run by a worker: its result and the records of its stages
+    collect()
+    with stage(name, task=True):
+        result = func(*args)
+    return result, collect()
+
+
+def write_trace(records, path):
+    events = []
+    for record in records:
+        args = dict(record["args"])
+        args.update(
+            cpu_s=round(record["cpu_s"], 4),
+            rss_mo=record["rss_mo"],
+            rss_delta_mo=record["rss_delta_mo"],
+            rss_peak_mo=record["rss_peak_mo"],
+        )
+        events.append(
+            {
+                "name": record["name"],
+                "ph": "X",
+                "ts": record["start"] * 1e6,
+                "dur": record["wall_s"] * 1e6,
+                "pid": record["pid"],
+                "tid": record["tid"],
+                "args": args,
+            }
+        )
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def slowest(records, count=5):
+    # Top level stages, the tasks, from the slowest
+    tasks = [record for record in records if record["args"].get("task")]
+    return sorted(tasks, key=lambda record: record["wall_s"], reverse=True)[:count]
@@ -0,0 +1,101 @@
+import io
+import pandas as pd
+import charts
+import data_loader
+import ehp_functions as ehp
+import excursions
+
+
+class TailReader:
+    # Follows an acquisition CSV while the acquisition system appends to it:
+    # each poll only parses the lines written since the previous one, and
+    # updates the gradients and the excursions from where they stopped
+    def __init__(self, file_name, app_mode, seg, window=None):
+        self.file_name = file_name
+        self.app_mode = app_mode
+        self.seg = seg
+        self.window = window
+        self.columns = charts.required_columns(app_mode)
+
+        self.offset = None
+        self.names = None
+        self.history = None
+        self.ehp_data = None
+        self.excursions = None
+        self.last_masks = {}
+
+    def _read_header(self, f):
+        lines = [f.readline() for _ in range(data_loader.HEADER_LINES + 1)]
+        if not lines[-1].endswith(b"\n"):
+            # Header not completely written yet
+            return False
+        self.names = list(pd.read_csv(io.BytesIO(lines[-1]), sep=";", nrows=0))
+        self.usecols, self.computed, self.raw = data_loader.plan_columns(
+            self.names, self.columns
+        )
+        self.offset = f.tell()
+        return True
+
+    def poll(self):
+        # Parse the complete lines appended since the previous poll, they are
+        # returned and added to ehp_data
+        with open(self.file_name, "rb") as f:
+            if self.offset is None and not self._read_header(f):
+                return None
+            f.seek(self.offset)
+            block = f.read()
+
+        # The last line may still be being written
+        end = block.rfind(b"\n")
+        if end < 0:
+            return None
+        self.offset += end + 1
+
+        chunk = pd.read_csv(
+            io.BytesIO(block[: end + 1]),
+            sep=";",
+            header=None,
+            names=self.names,
+            usecols=self.usecols,
+            dtype=data_loader.channel_dtypes(self.usecols),
+        )
+        if len(chunk) == 0:
+            return None
+        chunk, self.history = data_loader.prepare_chunk(
+            chunk, self.computed, self.raw, self.window, self.history
+        )
+
+        if self.ehp_data is None:
+            self.ehp_data = chunk
+        else:
+            self.ehp_data = pd.concat([self.ehp_data, chunk])
+        self._update_excursions(chunk)
+        return chunk
+
+    def _update_excursions(self, chunk):
+        # Excursions of the new lines, joined to the last known one of their
+        # criterion when it was still going on
+        times = data_loader.parse_time(chunk.index)
+        updated = []
+        for position, (name, column, mask) in enumerate(ehp.criteres(chunk, self.seg)):
+            new = excursions.intervals(mask, chunk[column].to_numpy(), times)
+            if self.excursions is None:
+                updated.append((name, new))
+            else:
+                continued = self.last_masks[name] and mask[0]
+                previous = self.excursions[position][1]
+                updated.append((name, excursions.merge(previous, new, continued)))
+            self.last_masks[name] = mask[-1]
+        self.excursions = updated
+
+    def changed_charts(self, chunk):
+        # Charts that get new points from the lines of the last poll
+        return [
+            name
+            for name in charts.CHART_NAMES
+            if len(
+                charts.chart_data(
+                    chunk, charts.chart_definition(name, self.app_mode), self.seg
+                )
+            )
+        ]
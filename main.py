@@ -1,14 +1,15 @@
-from concurrent.futures import ProcessPoolExecutor
 import multiprocessing
 import threading
-import ehp_functions as ehp
-import pandas as pd
+import charts
+import instrumentation
+from scheduler import Cancelled, PriorityScheduler
 import sys
 import os.path
 from PySide6.QtCore import (
     Qt,
     QObject,
     QThreadPool,
+    QTimer,
     QRunnable,
     Signal,
 )
@@ -26,12 +27,44 @@ from PySide6.QtWidgets import (
     QProgressBar,
     QDialog,
     QLineEdit,
+    QStackedWidget,
     QFormLayout,
     QCheckBox,
+    QMessageBox,
 )
 from PySide6.QtGui import QPixmap
 
 
+# Polling period of the followed acquisition file, in milliseconds
+LIVE_INTERVAL = 60_000
+
+# Delay after the last resize event before the chart is scaled smoothly, in
+# milliseconds, and number of scaled charts kept in memory
+RESIZE_DELAY = 150
+SCALED_CACHE_SIZE = 64
+
+# The processing and reporting stack is imported on first use or by a warm-up
+# thread once the window is shown, so that the window appears without
+# waiting for it
+HEAVY_MODULES = [
+    "numpy",
+    "pandas",
+    "plotly.express",
+    "openpyxl",
+    "docx",
+    "PIL.Image",
+    "ehp_functions",
+    "pipeline",
+    "live_tail",
+    "chart_view",
+]
+
+
+def heavy_imports():
+    for name in HEAVY_MODULES:
+        __import__(name)
+
+
 class CtrlClickButton(QPushButton):
     def __init__(self, callback=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -47,146 +80,179 @@ class CtrlClickButton(QPushButton):
 
 class WorkerSignals(QObject):
     progress_updated = Signal(int)
+    chart_ready = Signal(str)
+    # Loaded data, for the interactive view: (ehp_data, app_mode, seg)
+    data_ready = Signal(object)
+    # Stages recorded by a task, see instrumentation
+    records_ready = Signal(object)
+    # File that cannot be processed, with the reason
+    error = Signal(str)
+    finished = Signal()
 
 
 class LoadDataWorker(QRunnable):
-    def __init__(self, file_name, app_mode, pee, seg):
+    def __init__(
+        self, file_name, app_mode, pee, seg, chart_names=None, hors_criteres=True
+    ):
         super().__init__()
         self.file_name = file_name
         self.signals = WorkerSignals()
         self.app_mode = app_mode
         self.pee = pee
         self.seg = seg
+        # All the charts of the report by default
+        if chart_names is None:
+            chart_names = charts.CHART_NAMES
+        self.chart_names = chart_names
+        self.hors_criteres = hors_criteres
+        self.current_chart = None
+        self.scheduler = None
+        self.cancelled = False
+        self.lock = threading.Lock()
+        # Cancelled run this one supersedes, its cleanup must be over before
+        # new outputs are written
+        self.previous = None
+        self.done = threading.Event()
+        # Session pool of the window, a pool of this run only otherwise
+        self.pool = None
+        # Single Word document of all the charts, instead of one per chart
+        self.report = False
+
+    def priority(self, key):
+        # Displayed chart first, then its neighbours in the selector, then
+        # the other charts, the Word and Excel outputs last
+        kind, name = key
+        if kind not in ("chart", "figure", "render"):
+            return 3
+        if name == self.current_chart:
+            return 0
+        if self.current_chart is not None:
+            distance = abs(
+                charts.CHART_NAMES.index(name)
+                - charts.CHART_NAMES.index(self.current_chart)
+            )
+            if distance == 1:
+                return 1
+        return 2
+
+    def set_current_chart(self, name):
+        # Called by the GUI when another chart is selected during the run
+        self.current_chart = name
+        if self.scheduler is not None:
+            self.scheduler.set_priority(self.priority)
+
+    def cancel(self):
+        # Called by the GUI when the run is cancelled or superseded by a new
+        # one: pending tasks are dropped, the workers stopped when they were
+        # running a task and the outputs already written removed
+        with self.lock:
+            self.cancelled = True
+            if self.scheduler is not None:
+                stopped = self.scheduler.cancel()
+                if stopped and self.pool is not None:
+                    self.pool.discard(self.scheduler.executor)
 
     def run(self):
-        # Data Formatter
-        ehp_data = pd.read_csv(self.file_name, sep=";", skiprows=20)
-        ehp_data = pd.DataFrame(ehp_data)
-        ehp_data = ehp_data.rename(columns={"Horodatage": "index"}).set_index(
-            "index", drop=False
-        )
-        ehp_data = ehp_data.iloc[::10, :]
-
-        # Folders creation
-        word_folder = "courbes_word"
-        png_folder = "courbes_png"
-        hc_folder = "Hors_critères"
-
-        word_folder_path = os.path.join(os.getcwd(), word_folder)
-        if not os.path.exists(word_folder_path):
-            os.mkdir(word_folder_path)
-
-        png_folder_path = os.path.join(os.getcwd(), png_folder)
-        if not os.path.exists(png_folder_path):
-            os.mkdir(png_folder_path)
-
-        hc_folder_path = os.path.join(os.getcwd(), hc_folder)
-        if not os.path.exists(hc_folder_path):
-            os.mkdir(hc_folder_path)
-
-        # # Figures plotting
-
-        # Define a list of functions and their arguments to be executed in parallel
-        tasks = [
-            (
-                ehp.rcp,
-                (ehp_data, self.pee),
-            ),
-            (
-                ehp.pression_refoulement_mule,
-                (ehp_data, self.app_mode, self.pee),
-            ),
-            (
-                ehp.pression_refoulement_mule_detail,
-                (ehp_data, self.app_mode, self.pee),
-            ),
-            (
-                ehp.temperature_gros_composants_fond_de_cuve,
-                (ehp_data, self.pee),
-            ),
-            (
-                ehp.temperature_gros_composants_couvercle_et_pressu,
-                (ehp_data, self.pee),
-            ),
-            (
-                ehp.temperature_gros_composants_gv,
-                (ehp_data, self.app_mode, self.pee),
-            ),
-            (
-                ehp.pgrad,
-                (ehp_data, self.pee),
-            ),
-            (
-                ehp.tmoy,
-                (ehp_data, self.pee),
-            ),
-            (
-                ehp.tgrad,
-                (ehp_data, self.pee, self.seg),
-            ),
-            (
-                ehp.tfluid1,
-                (ehp_data, self.app_mode, self.pee),
-            ),
-            (
-                ehp.tfluid2,
-                (ehp_data, self.app_mode, self.pee),
-            ),
-            (
-                ehp.tfluid3,
-                (ehp_data, self.app_mode, self.pee),
-            ),
-            (
-                ehp.tmetal1,
-                (ehp_data, self.pee),
-            ),
-            (
-                ehp.tmetal2,
-                (ehp_data, self.pee),
-            ),
-            (
-                ehp.tmetal3,
-                (ehp_data, self.app_mode, self.pee),
-            ),
-            (
-                ehp.evolution_pression_epreuve,
-                (ehp_data, self.pee),
-            ),
-            (
-                ehp.evolution_pression_epreuve_palier,
-                (ehp_data, self.pee),
-            ),
-            (
-                ehp.hors_criteres,
-                (ehp_data, self.seg),
-            ),
-        ]
-
-        # Calculate the number of worker processes
-        num_cores = multiprocessing.cpu_count()
-        max_workers = num_cores // 2
-
-        # Initialize a shared progress variable and a lock for thread-safe updates
-        progress = 0
-        progress_lock = threading.Lock()
-
-        def callback():
-            nonlocal progress
-            with progress_lock:
-                progress += 100 / 16
-                self.signals.progress_updated.emit(progress)
-
-        # Run tasks in parallel using a ProcessPoolExecutor
-        with ProcessPoolExecutor(max_workers=max_workers) as executor:
-            futures = []
-            for index, (func, args) in enumerate(tasks):
-                future = executor.submit(func, *args)
-                future.add_done_callback(lambda _: callback())
-                futures.append(future)
-
-            # Wait for all tasks to complete
-            for future in futures:
-                future.result()
+        import data_loader
+
+        try:
+            # Data Formatter, only the channels of the selected charts are read
+            columns = charts.required_columns(
+                self.app_mode, self.chart_names, self.hors_criteres
+            )
+            try:
+                with instrumentation.stage("load", file=self.file_name):
+                    ehp_data = data_loader.load_data(self.file_name, columns)
+            except ValueError as error:
+                # Export without the channels of the palier
+                self.signals.error.emit(str(error))
+                return
+            if self.cancelled:
+                return
+            # Only the data of every chart can be browsed in the interactive
+            # view
+            if self.chart_names == charts.CHART_NAMES:
+                self.signals.data_ready.emit((ehp_data, self.app_mode, self.seg))
+            self.process(ehp_data)
+        finally:
+            self.done.set()
+            self.signals.finished.emit()
+
+    def process(self, ehp_data):
+        import pipeline
+
+        if self.previous is not None:
+            self.previous.done.wait()
+            self.previous = None
+        pipeline.create_folders()
+        if not self.chart_names and not self.hors_criteres or self.cancelled:
+            return
+
+        pool = self.pool
+        if pool is None:
+            # Worker processes sized from the cores and the free memory
+            pool = pipeline.WorkerPool(pipeline.worker_count())
+
+        # Run tasks in parallel on the worker processes, in priority order
+        try:
+            with self.lock:
+                if self.cancelled:
+                    return
+                self.scheduler = PriorityScheduler(
+                    pool.get(), pool.max_workers, self.priority
+                )
+            try:
+                pipeline.process(
+                    self.scheduler,
+                    ehp_data,
+                    self.app_mode,
+                    self.pee,
+                    self.seg,
+                    self.chart_names,
+                    self.hors_criteres,
+                    on_chart_ready=self.signals.chart_ready.emit,
+                    on_progress=self.signals.progress_updated.emit,
+                    on_records=self.signals.records_ready.emit,
+                    # Only a run of every chart has all the pages
+                    report=self.report and self.chart_names == charts.CHART_NAMES,
+                    report_summary=self.hors_criteres,
+                )
+            except Cancelled:
+                pass
+        finally:
+            if pool is not self.pool:
+                pool.shutdown(wait=True)
+
+
+class LiveTailWorker(LoadDataWorker):
+    # One poll of a followed acquisition, only the charts that get new points
+    # are rendered again
+    def __init__(self, reader, pee):
+        super().__init__(reader.file_name, reader.app_mode, pee, reader.seg, [])
+        self.reader = reader
+
+    def run(self):
+        import ehp_functions as ehp
+
+        try:
+            with instrumentation.stage("poll", file=self.file_name):
+                chunk = self.reader.poll()
+            if chunk is None:
+                return
+            self.signals.data_ready.emit(
+                (self.reader.ehp_data, self.app_mode, self.seg)
+            )
+            self.chart_names = self.reader.changed_charts(chunk)
+            self.hors_criteres = False
+            self.process(self.reader.ehp_data)
+            if self.cancelled:
+                return
+
+            # Excursions were updated with the new lines only
+            ehp.export_excursions(self.reader.excursions)
+        finally:
+            self.done.set()
+            self.signals.finished.emit()
 
 
 class MainWindow(QMainWindow):
@@ -230,10 +296,16 @@ class MainWindow(QMainWindow):
         checkbox_layout = QVBoxLayout()
         self.checkbox_seg = QCheckBox("Segrégation Carbone")
         checkbox_layout.addWidget(self.checkbox_seg)
+        self.checkbox_live = QCheckBox("Suivi en direct")
+        checkbox_layout.addWidget(self.checkbox_live)
+        self.checkbox_report = QCheckBox("Rapport unique")
+        checkbox_layout.addWidget(self.checkbox_report)
         checkbox_container.setLayout(checkbox_layout)
 
         # "Tracer" button
         self.load_data_button = QPushButton("Tracer")
+        self.reload_chart_button = QPushButton("Retracer la courbe")
+        self.cancel_button = QPushButton("Annuler")
         self.about_button = CtrlClickButton(
             callback=self.tracer_special,
             text="About",
@@ -258,6 +330,8 @@ class MainWindow(QMainWindow):
         # controls_layout.addWidget(tempinf50_container)
         controls_layout.addWidget(checkbox_container)
         controls_layout.addWidget(self.load_data_button)
+        controls_layout.addWidget(self.reload_chart_button)
+        controls_layout.addWidget(self.cancel_button)
         controls_layout.addWidget(progress_bar_container)
         controls_layout.addStretch(1)
         controls_layout.addWidget(self.about_button)
@@ -272,28 +346,10 @@ class MainWindow(QMainWindow):
 
         # Create and add the image selector widgets to the layout
         self.selection_courbe = QComboBox()
-        self.selection_courbe.addItems(
-            [
-                "Evolution de la pression RCP pendant l'EHP",
-                "Evolution de la pression de refoulement de la pompe de charge",
-                "Evolution de la pression de refoulement de la pompe de charge - détail",
-                "Température des gros composants du CPP - Fond de cuve",
-                "Température des gros composants du CPP - couvercle et pressu",
-                "Température des gros composants du CPP - GVs",
-                "Gradients de Pression de l'EHP",
-                "Suivi de la Tmoy de l'EHP",
-                "Suivi du gradient de Tmoy de l'EHP",
-                "Suivi des températures fluide pendant l'EHP - 1",
-                "Suivi des températures fluide pendant l'EHP - 2",
-                "Suivi des températures fluide pendant l'EHP - 3",
-                "Gradient des températures métal pendant l'EHP - Fond de cuve",
-                "Gradient des températures métal pendant l'EHP - Couvercle et Pressu",
-                "Gradient des températures métal pendant l'EHP - GV",
-                "Evolution de la pression pendant le palier d'épreuve",
-                "Evolution de la pression pendant le palier d'épreuve - détail",
-            ]
-        )
+        self.selection_courbe.addItems([chart["label"] for chart in charts.CHARTS])
         image_selector_layout.addWidget(self.selection_courbe)
+        self.checkbox_interactive = QCheckBox("Vue interactive")
+        image_selector_layout.addWidget(self.checkbox_interactive)
         image_selector_container = QGroupBox()
         image_selector_container.setLayout(image_selector_layout)
         image_selector_container.setFixedHeight(45)
@@ -306,7 +362,13 @@ class MainWindow(QMainWindow):
         # Create and populate the image display layout
         image_display_layout = QVBoxLayout()
         image_display_layout.addWidget(image_selector_container)
-        image_display_layout.addWidget(self.image_label)
+        # The PNG of the report, or the interactive view of the loaded data
+        # created on first use
+        self.display = QStackedWidget()
+        self.display.addWidget(self.image_label)
+        self.viewer = None
+        self.viewer_data = None
+        image_display_layout.addWidget(self.display)
 
         # Create an image display container
         image_display_container = QGroupBox()
@@ -320,61 +382,85 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(image_display_container)
 
         self.load_data_button.clicked.connect(self.get_file_window)
-        self.resizeEvent = lambda event: self.tracer()
+        self.reload_chart_button.clicked.connect(self.reload_chart)
+        self.cancel_button.clicked.connect(self.cancel_run)
+        self.resizeEvent = self.resized
         self.selection_courbe.currentIndexChanged.connect(self.tracer)
+        self.selection_courbe.currentIndexChanged.connect(self.reprioritize)
+        self.selection_courbe.currentIndexChanged.connect(self.show_interactive)
+        self.checkbox_interactive.toggled.connect(self.interactive_toggled)
         self.about_button.clicked.connect(self.about_window)
 
-    def ehp_function_selector(self):
-        index = self.selection_courbe.currentIndex()
-
-        if index == 0:
-            name = "rcp"
-        if index == 1:
-            name = "pression_refoulement_mule"
-        if index == 2:
-            name = "pression_refoulement_mule_detail"
-        if index == 3:
-            name = "temperature_gros_composants_fond_de_cuve"
-        if index == 4:
-            name = "temperature_gros_composants_brides_JEP"
-        if index == 5:
-            name = "temperature_gros_composants_gv"
-        if index == 6:
-            name = "gradients_de_pression"
-        if index == 7:
-            name = "Tmoy"
-        if index == 8:
-            name = "Tgrad"
-        if index == 9:
-            name = "Tfluide1"
-        if index == 10:
-            name = "Tfluide2"
-        if index == 11:
-            name = "Tfluide3"
-        if index == 12:
-            name = "Tmetal1"
-        if index == 13:
-            name = "Tmetal2"
-        if index == 14:
-            name = "Tmetal3"
-        if index == 15:
-            name = "P_primaire_epreuve"
-        if index == 16:
-            name = "P_primaire_palier"
+        # Follow mode, the acquisition file is polled while it is written
+        self.live_reader = None
+        self.live_running = False
+        self.live_timer = QTimer(self)
+        self.live_timer.setInterval(LIVE_INTERVAL)
+        self.live_timer.timeout.connect(self.live_poll)
+        self.checkbox_live.toggled.connect(self.live_toggled)
+
+        # Runs have their own threads: Qt scales images on the global pool,
+        # which must stay free, and a new run starts while the one it
+        # supersedes is stopping
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(2)
+        self.pool = None
+        self.pool_lock = threading.Lock()
+
+        # Decoded charts with the modification time of their PNG, and their
+        # smoothly scaled versions per label size
+        self.pixmaps = {}
+        self.scaled = {}
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(RESIZE_DELAY)
+        self.resize_timer.timeout.connect(self.tracer)
 
+    def ehp_function_selector(self):
+        name = self.current_chart()
         fig = "courbes_png/" + name + ".png"
         return fig
 
-    def tracer(self):
+    def chart_pixmap(self):
+        # Decoded PNG of the displayed chart, read again only when its file
+        # has changed
         fig = self.ehp_function_selector()
-        pixmap = QPixmap(fig)
+        try:
+            mtime = os.path.getmtime(fig)
+        except OSError:
+            mtime = None
+        cached = self.pixmaps.get(fig)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, QPixmap(fig))
+            self.pixmaps[fig] = cached
+            for key in [key for key in self.scaled if key[0] == fig]:
+                del self.scaled[key]
+        return fig, cached[1]
+
+    def tracer(self):
+        fig, pixmap = self.chart_pixmap()
+        size = self.image_label.size()
+        key = (fig, size.width(), size.height())
+        scaled = self.scaled.get(key)
+        if scaled is None:
+            scaled = pixmap.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            if len(self.scaled) >= SCALED_CACHE_SIZE:
+                self.scaled.clear()
+            self.scaled[key] = scaled
+        self.image_label.setPixmap(scaled)
+
+    def resized(self, event):
+        # Fast preview while the window is being resized, the smooth scaling
+        # is done once the resizing stops
+        _, pixmap = self.chart_pixmap()
         self.image_label.setPixmap(
             pixmap.scaled(
                 self.image_label.size(),
                 Qt.KeepAspectRatio,
-                Qt.SmoothTransformation,
+                Qt.FastTransformation,
             )
         )
+        self.resize_timer.start()
 
     def tracer_special(self):
         # Function used to define the image path when packaged with pyinstaller
@@ -394,15 +480,172 @@ class MainWindow(QMainWindow):
             )
         )
 
-    def load_data(self, file_name):
-        app_mode = self.palier.currentText()
-        pee = self.pee_site.text() + " " + self.pee_site_arret.text()
+    def current_chart(self):
+        return charts.CHART_NAMES[self.selection_courbe.currentIndex()]
+
+    def pee(self):
+        return self.pee_site.text() + " " + self.pee_site_arret.text()
+
+    def seg(self):
         seg = 50
         if self.checkbox_seg.isChecked():
             seg = 60
-        worker = LoadDataWorker(file_name, app_mode, pee, seg)
+        return seg
+
+    def worker_pool(self):
+        # Worker processes of the session, started by warm_up
+        import pipeline
+
+        with self.pool_lock:
+            if self.pool is None:
+                self.pool = pipeline.WorkerPool(pipeline.worker_count())
+            return self.pool
+
+    def warm_up(self):
+        # Run by a thread once the window is shown
+        heavy_imports()
+        self.worker_pool().warm()
+
+    def closeEvent(self, event):
+        if self.pool is not None:
+            import render_service
+
+            self.cancel_run()
+            self.pool.shutdown()
+            render_service.stop()
+        super().closeEvent(event)
+
+    def start_worker(self, worker):
+        # A new run supersedes the one still going on
+        worker.pool = self.worker_pool()
+        worker.previous = getattr(self, "worker", None)
+        self.cancel_run()
+        worker.set_current_chart(self.current_chart())
         worker.signals.progress_updated.connect(self.update_progress)
-        QThreadPool.globalInstance().start(worker)
+        worker.signals.chart_ready.connect(self.chart_ready)
+        worker.signals.data_ready.connect(self.data_ready)
+        worker.signals.records_ready.connect(self.records_ready)
+        worker.signals.error.connect(self.load_error)
+        worker.signals.finished.connect(lambda: self.worker_finished(worker))
+        self.records = []
+        self.worker = worker
+        self.thread_pool.start(worker)
+
+    def load_data(self, file_name, chart_names=None, hors_criteres=True):
+        self.file_name = file_name
+        if self.checkbox_live.isChecked():
+            self.start_live()
+            return
+        app_mode = self.palier.currentText()
+        worker = LoadDataWorker(
+            file_name, app_mode, self.pee(), self.seg(), chart_names, hors_criteres
+        )
+        worker.report = self.checkbox_report.isChecked()
+        self.start_worker(worker)
+
+    def start_live(self):
+        from live_tail import TailReader
+
+        # Follow the last loaded file from its beginning
+        self.live_reader = TailReader(
+            self.file_name, self.palier.currentText(), self.seg()
+        )
+        self.live_poll()
+        self.live_timer.start()
+
+    def live_toggled(self, checked):
+        if not checked:
+            self.live_timer.stop()
+            self.live_reader = None
+        elif getattr(self, "file_name", None):
+            self.start_live()
+
+    def live_poll(self):
+        # A poll is skipped while the previous one is still rendering
+        if self.live_reader is None or self.live_running:
+            return
+        self.live_running = True
+        worker = LiveTailWorker(self.live_reader, self.pee())
+        worker.signals.finished.connect(self.live_finished)
+        self.start_worker(worker)
+
+    def live_finished(self):
+        self.live_running = False
+
+    def worker_finished(self, worker):
+        if worker is self.worker:
+            self.worker = None
+
+    def load_error(self, message):
+        self.progress_bar.setValue(0)
+        QMessageBox.critical(
+            self,
+            "Erreur de chargement",
+            "Le fichier %s ne peut pas être traité :\n%s"
+            % (os.path.basename(self.file_name), message),
+        )
+
+    def cancel_run(self):
+        worker = getattr(self, "worker", None)
+        if worker is not None:
+            worker.cancel()
+            self.worker = None
+            self.progress_bar.setValue(0)
+
+    def reprioritize(self):
+        # Render the newly selected chart next
+        worker = getattr(self, "worker", None)
+        if worker is not None:
+            worker.set_current_chart(self.current_chart())
+
+    def records_ready(self, records):
+        # The slowest tasks of the run are shown on the progress bar
+        self.records.extend(records)
+        self.progress_bar.setToolTip(
+            "\n".join(
+                "%s: %.1f s (CPU %.1f s, %+.0f Mo, pic %.0f Mo, PID %d)"
+                % (
+                    record["name"],
+                    record["wall_s"],
+                    record["cpu_s"],
+                    record["rss_delta_mo"],
+                    record["rss_peak_mo"],
+                    record["pid"],
+                )
+                for record in instrumentation.slowest(self.records)
+            )
+        )
+
+    def data_ready(self, data):
+        self.viewer_data = data
+        if self.viewer is not None:
+            self.viewer.set_data(*data)
+        self.show_interactive()
+
+    def interactive_toggled(self, checked):
+        if checked and self.viewer is None:
+            from chart_view import ChartViewer
+
+            self.viewer = ChartViewer()
+            self.display.addWidget(self.viewer)
+            if self.viewer_data is not None:
+                self.viewer.set_data(*self.viewer_data)
+        self.display.setCurrentWidget(self.viewer if checked else self.image_label)
+        self.show_interactive()
+
+    def show_interactive(self):
+        if self.checkbox_interactive.isChecked():
+            self.viewer.show_chart(self.current_chart())
+
+    def chart_ready(self, name):
+        if name == self.current_chart():
+            self.tracer()
+
+    def reload_chart(self):
+        # Only regenerate the displayed chart of the last loaded file
+        file_name = getattr(self, "file_name", None)
+        if file_name:
+            self.load_data(file_name, [self.current_chart()], hors_criteres=False)
 
     def update_progress(self, value):
         self.progress_bar.setValue(value)
@@ -449,4 +692,7 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
+    # Load the processing stack and start the workers while the user picks a
+    # file
+    QTimer.singleShot(0, threading.Thread(target=window.warm_up, daemon=True).start)
     sys.exit(app.exec())
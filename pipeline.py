@@ -0,0 +1,365 @@
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import resource_tracker
+import os
+import threading
+import time
+import ehp_functions as ehp
+import shared_data
+import instrumentation
+import render_service
+import task_costs
+from scheduler import Cancelled
+
+# Output folders of a report, in its output folder
+FOLDERS = ["courbes_word", "courbes_png", "Hors_critères"]
+
+# Resident memory of a worker process: the plotting stack and the views of
+# the shared data, plus its own Kaleido when it renders its figures itself
+WORKER_MEMORY = 250 * 1024**2
+KALEIDO_MEMORY = 250 * 1024**2
+
+# Stages of a chart, each fed by the previous one through a bounded queue:
+# the figure is built by a worker process from the shared data, rendered by
+# the render service, rotated and encoded for Word, then written as a
+# document. Workers that render their figures themselves build and render
+# it in the same task.
+CHART_STAGES = ["figure", "render", "encode", "document"]
+WORKER_RENDER_STAGES = ["chart", "encode", "document"]
+
+# Threads of the stages run by the main process, each of them may have twice
+# as many inputs waiting. The render threads wait for the render service,
+# whose Kaleido renders one figure at a time; the encodes and the Word and
+# Excel writes share the interpreter of the main process.
+THREAD_STAGES = {
+    "render": 2,
+    "encode": 2,
+    "document": 2,
+}
+
+
+def create_folders(folder="."):
+    for name in FOLDERS:
+        os.makedirs(os.path.join(folder, name), exist_ok=True)
+
+
+def remove_outputs(folder, since):
+    # Outputs written since the start of a cancelled run, complete or not
+    for name in FOLDERS:
+        path = os.path.join(folder, name)
+        for file in os.listdir(path):
+            file = os.path.join(path, file)
+            try:
+                if os.path.getmtime(file) >= since:
+                    os.remove(file)
+            except OSError:
+                pass
+
+
+def cpu_cores():
+    # Cores this process may run on
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def available_memory():
+    # Memory that can be used without swapping, in bytes, None if unknown
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if os.name == "nt":
+        return _windows_available_memory()
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def _windows_available_memory():
+    import ctypes
+
+    class MemoryStatus(ctypes.Structure):
+        _fields_ = [
+            ("dwLength", ctypes.c_ulong),
+            ("dwMemoryLoad", ctypes.c_ulong),
+            ("ullTotalPhys", ctypes.c_ulonglong),
+            ("ullAvailPhys", ctypes.c_ulonglong),
+            ("ullTotalPageFile", ctypes.c_ulonglong),
+            ("ullAvailPageFile", ctypes.c_ulonglong),
+            ("ullTotalVirtual", ctypes.c_ulonglong),
+            ("ullAvailVirtual", ctypes.c_ulonglong),
+            ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+        ]
+
+    status = MemoryStatus()
+    status.dwLength = ctypes.sizeof(MemoryStatus)
+    ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))
+    return status.ullAvailPhys
+
+
+def worker_count(render=True):
+    # Chart worker processes: every core but one, left to the main process
+    # and its write threads, as long as they fit in the free memory
+    count = cpu_cores() - 1
+    memory = available_memory()
+    if memory is not None:
+        per_worker = WORKER_MEMORY + (0 if render else KALEIDO_MEMORY)
+        count = min(count, memory // per_worker)
+    return max(1, count)
+
+
+def init_worker(render_address=None):
+    # Pool initializer: the libraries and the plotting stack are loaded
+    # before the first task comes, the Word documents are written by the
+    # main process
+    import plotly.express as px
+
+    if render_address is not None:
+        render_service.connect(*render_address)
+    # The first figure builds plotly's templates and validators
+    fig = px.line(x=[0, 1], y=[0, 1])
+    if render_address is None:
+        # Start the Kaleido of this worker
+        render_service.render(fig)
+
+
+def executor(max_workers, render=True):
+    # Process pool of the chart tasks, its workers render their figures
+    # through the same warm Kaleido when render is set
+    render_address = render_service.start() if render else None
+    if os.name == "posix":
+        # Workers share the resource tracker of this process, a tracker of
+        # their own would unlink the shared data when a worker exits
+        resource_tracker.ensure_running()
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=init_worker,
+        initargs=(render_address,),
+    )
+
+
+class WorkerPool:
+    # Process pool kept for the whole session, so runs and regenerated charts
+    # do not start and warm new workers. It is created again when a
+    # cancelled run stopped its workers, and warmed again in the background.
+    def __init__(self, max_workers, render=True):
+        self.max_workers = max_workers
+        self.render = render
+        self.executor = None
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            if self.executor is None or getattr(self.executor, "_broken", False):
+                self.executor = executor(self.max_workers, self.render)
+            return self.executor
+
+    def warm(self):
+        # Start every worker now rather than on the first run
+        with self.lock:
+            if self.closed:
+                return
+        pool = self.get()
+        try:
+            for future in [pool.submit(os.getpid) for _ in range(self.max_workers)]:
+                future.result()
+        except (RuntimeError, CancelledError):
+            # Pool discarded or shut down meanwhile, the next run starts it
+            pass
+
+    def discard(self, pool):
+        # Pool whose workers were stopped, its replacement starts its workers
+        # before the next run needs them
+        with self.lock:
+            if self.executor is pool:
+                self.executor = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        threading.Thread(target=self.warm, daemon=True).start()
+
+    def shutdown(self, wait=False):
+        with self.lock:
+            self.closed = True
+            pool, self.executor = self.executor, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def process(
+    scheduler,
+    ehp_data,
+    app_mode,
+    pee,
+    seg,
+    chart_names,
+    hors_criteres=True,
+    folder=".",
+    on_chart_ready=None,
+    on_progress=None,
+    on_records=None,
+    render=True,
+    report=False,
+    report_summary=False,
+    export_format="xlsx",
+    template=ehp.TEMPLATE,
+):
+    # Charts, Word documents and excursions of a report, run by scheduler.
+    # Returns the generated charts, the number of excursions per criterion and
+    # the trace of the run, written next to the outputs. on_records receives
+    # the stages of each task once it is done. The figures are rendered by the
+    # render service when render is set, by the worker processes otherwise.
+    # With report, the charts go into a single Word document instead of one
+    # each, followed by the number of excursions of each criterion with
+    # report_summary. The excursions are exported as export_format and the
+    # documents written from the Word template.
+    create_folders(folder)
+    trace = os.path.join(folder, instrumentation.TRACE_FILE)
+    summary = {"charts": [], "hors_criteres": None, "trace": trace}
+    if not chart_names and not hors_criteres:
+        return summary
+
+    # Stages already recorded by this thread, such as the loading
+    records = instrumentation.collect()
+    start = time.time()
+
+    stages = CHART_STAGES if render else WORKER_RENDER_STAGES
+    if report:
+        # The encoded images are kept for the report
+        stages = stages[:-1]
+    images = {}
+    total = len(stages) * len(chart_names) + int(hors_criteres) + int(report)
+    done = 0
+    progress_lock = threading.Lock()
+
+    def advance():
+        nonlocal done
+        with progress_lock:
+            done += 1
+            if on_progress is not None:
+                on_progress(100 * done // total)
+
+    # The figures are built on the worker processes, the other stages run on
+    # threads of this process, which also have the data at hand for the
+    # hors critères. The longest tasks of the previous runs start first.
+    threads = {}
+    for stage, workers in THREAD_STAGES.items():
+        threads[stage] = ThreadPoolExecutor(max_workers=workers)
+        scheduler.add_executor(stage, threads[stage], workers, 2 * workers)
+    scheduler.set_cost(lambda key: task_costs.expected(task_name(key)))
+    if render:
+        # The render threads send their figures to the render service too
+        render_service.connect(*render_service.start())
+
+    def submit(stage, name, result=None):
+        # Function and arguments of the stage, result is the output of the
+        # previous one
+        if stage == "figure":
+            task = (shared_data.run_shared, ehp.build_figure, descriptor, name)
+            task += (app_mode, seg)
+        elif stage == "chart":
+            task = (shared_data.run_shared, ehp.generate_chart, descriptor, name)
+            task += (app_mode, seg, folder)
+        elif stage == "render":
+            task = (ehp.output_generator, result, name, folder)
+        elif stage == "encode":
+            task = (ehp.encode_image, result, name)
+        else:
+            task = (ehp.document_generator, result, name, pee, folder, template)
+        following = stages.index(stage) + 1
+        scheduler.add(
+            (stage, name),
+            instrumentation.run_task,
+            task_name((stage, name)),
+            *task,
+            callback=callback,
+            executor=stage if stage in threads else "process",
+            feeds=stages[following] if following < len(stages) else None,
+        )
+
+    def callback(key, result):
+        stage, name = key
+        result, task_records = result
+        records.extend(task_records)
+        if on_records is not None:
+            on_records(task_records)
+        if stage == "hors_criteres":
+            summary["hors_criteres"] = result
+        else:
+            if stage in ("chart", "render"):
+                # The PNG can be shown
+                summary["charts"].append(name)
+                if on_chart_ready is not None:
+                    on_chart_ready(name)
+            following = stages.index(stage) + 1
+            if following < len(stages):
+                submit(stages[following], name, result)
+            elif report:
+                images[name] = result
+        advance()
+
+    # Place the data once in shared memory, the workers only receive
+    # a descriptor of it instead of a pickled copy per task
+    with instrumentation.stage("share"):
+        descriptor, shared_blocks = shared_data.share_dataframe(ehp_data)
+    try:
+        for name in chart_names:
+            submit(stages[0], name)
+        if hors_criteres:
+            scheduler.add(
+                ("hors_criteres", None),
+                instrumentation.run_task,
+                "hors_criteres",
+                ehp.hors_criteres,
+                ehp_data,
+                seg,
+                export_format,
+                folder,
+                callback=callback,
+                executor="document",
+            )
+
+        # Wait for all tasks to complete
+        scheduler.run()
+
+        if report:
+            # Written by this thread, after its own stages such as the sharing
+            records.extend(instrumentation.collect())
+            _, task_records = instrumentation.run_task(
+                "report",
+                ehp.report_generator,
+                [images[name] for name in chart_names],
+                pee,
+                summary["hors_criteres"] if report_summary else None,
+                folder,
+                template,
+            )
+            records.extend(task_records)
+            if on_records is not None:
+                on_records(task_records)
+            advance()
+    except Cancelled:
+        # The renders and writes already started cannot be stopped, they are
+        # removed once finished
+        for executor in threads.values():
+            executor.shutdown(wait=True)
+        remove_outputs(folder, start)
+        raise
+    finally:
+        for executor in threads.values():
+            executor.shutdown(wait=False)
+        shared_data.release(shared_blocks)
+        if not scheduler.cancelled:
+            records.extend(instrumentation.collect())
+            instrumentation.write_trace(records, trace)
+            task_costs.update(records)
+    return summary
+
+
+def task_name(key):
+    # Name of the task in the records of a run
+    kind, name = key
+    return kind if name is None else kind + ":" + name
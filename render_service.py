@@ -0,0 +1,105 @@
+import os
+import threading
+import multiprocessing
+from multiprocessing.connection import Client, Listener
+
+# Render service of the application, started once and shared by every run
+_service = None
+
+# Address of the render service this process sends its figures to
+_address = None
+_authkey = None
+_local = threading.local()
+
+
+def _serve(pipe, authkey):
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    listener = Listener(authkey=authkey)
+
+    # Start Kaleido's Chromium before accepting figures
+    go.Figure().to_image(format="png")
+    pipe.send(listener.address)
+    pipe.close()
+
+    # One thread per connected worker, Kaleido renders one figure at a time
+    lock = threading.Lock()
+
+    def handle(connection):
+        with connection:
+            while True:
+                try:
+                    fig, image_format = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    with lock:
+                        image = pio.to_image(fig, format=image_format, validate=False)
+                    reply = (True, image)
+                except Exception as error:
+                    reply = (False, repr(error))
+                try:
+                    connection.send(reply)
+                except (EOFError, OSError):
+                    # Worker stopped while its figure was rendered, the run
+                    # was cancelled
+                    return
+
+    while True:
+        connection = listener.accept()
+        threading.Thread(target=handle, args=(connection,), daemon=True).start()
+
+
+def start():
+    # Start the render service if needed and return what the workers need
+    # to connect to it
+    global _service
+    if _service is None or not _service[0].is_alive():
+        authkey = os.urandom(16)
+        parent_pipe, child_pipe = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(
+            target=_serve, args=(child_pipe, authkey), daemon=True
+        )
+        process.start()
+        child_pipe.close()
+        address = parent_pipe.recv()
+        parent_pipe.close()
+        _service = (process, address, authkey)
+    return _service[1], _service[2]
+
+
+def stop():
+    global _service
+    if _service is not None:
+        _service[0].terminate()
+        _service[0].join()
+        _service = None
+
+
+def connect(address, authkey):
+    # Pool initializer: send the figures of this process to the render service
+    global _address, _authkey
+    _address = address
+    _authkey = authkey
+
+
+def render(fig, image_format="png"):
+    if _address is None:
+        return fig.to_image(format=image_format)
+
+    connection = getattr(_local, "connection", None)
+    try:
+        if connection is None:
+            connection = Client(_address, authkey=_authkey)
+            _local.connection = connection
+        connection.send((fig.to_dict(), image_format))
+        ok, image = connection.recv()
+    except (EOFError, OSError):
+        # Render service gone, render in this process instead
+        _local.connection = None
+        return fig.to_image(format=image_format)
+
+    if not ok:
+        raise RuntimeError("Rendering failed: " + image)
+    return image
@@ -0,0 +1,138 @@
+import itertools
+import threading
+
+
+class Cancelled(Exception):
+    pass
+
+
+class PriorityScheduler:
+    # Tasks are only handed to an executor when one of its workers is free,
+    # so the pending task with the lowest priority value always starts next,
+    # even when priorities change during the run. Between tasks of the same
+    # priority, the one with the largest cost starts first.
+    #
+    # Tasks run on the process executor by default; other executors, such as
+    # threads for the I/O bound tasks, are added with add_executor. The
+    # executors can be chained as the stages of a pipeline: a task that feeds
+    # a stage with a queue size only starts while that stage has room for
+    # its output, so a fast stage does not pile up work for a slow one.
+    def __init__(self, executor, max_workers, priority=None, cost=None):
+        self.executor = executor
+        self.executors = {"process": (executor, max_workers, None)}
+        self.running = {"process": 0}
+        self.priority = priority or (lambda key: 0)
+        self.cost = cost or (lambda key: 0)
+        self.pending = []
+        self.futures = []
+        self.order = itertools.count()
+        self.condition = threading.Condition()
+        self.cancelled = False
+
+    def add_executor(self, name, executor, max_workers, queue_size=None):
+        # queue_size: tasks of this executor waiting for a worker, at most
+        with self.condition:
+            self.executors[name] = (executor, max_workers, queue_size)
+            self.running[name] = 0
+
+    def add(self, key, func, *args, callback=None, executor="process", feeds=None):
+        # callback(key, result) is called once the task is done, it may add
+        # more tasks, on the executor feeds
+        with self.condition:
+            if self.cancelled:
+                return
+            self.pending.append(
+                (next(self.order), key, func, args, callback, executor, feeds)
+            )
+            self.condition.notify()
+
+    def set_priority(self, priority):
+        with self.condition:
+            self.priority = priority
+
+    def set_cost(self, cost):
+        with self.condition:
+            self.cost = cost
+
+    def cancel(self):
+        # Drop the pending tasks and stop the running ones, run() then raises
+        # Cancelled. Running threads cannot be stopped, they finish their
+        # task. Returns whether the worker processes were stopped, only when
+        # a task was running on them.
+        with self.condition:
+            self.cancelled = True
+            self.pending.clear()
+            for future in self.futures:
+                future.cancel()
+            self.condition.notify()
+            if not self.running["process"]:
+                return False
+        # A running task can only be stopped with its worker process, the
+        # executor has no public way to do it
+        processes = getattr(self.executor, "_processes", None) or {}
+        for process in list(processes.values()):
+            process.terminate()
+        return True
+
+    def _ready(self, task, waiting):
+        executor, feeds = task[5], task[6]
+        if self.running[executor] >= self.executors[executor][1]:
+            return False
+        if feeds is None or self.executors[feeds][2] is None:
+            return True
+        # Only the tasks waiting for the next stage count, the running tasks
+        # of this stage add at most one output per worker to them
+        return waiting.get(feeds, 0) < self.executors[feeds][2]
+
+    def _next_task(self):
+        # Pending task of highest priority among those with a free worker
+        # and room for their output
+        waiting = {}
+        for task in self.pending:
+            waiting[task[5]] = waiting.get(task[5], 0) + 1
+        ready = [task for task in self.pending if self._ready(task, waiting)]
+        if not ready:
+            return None
+        task = min(
+            ready,
+            key=lambda task: (self.priority(task[1]), -self.cost(task[1]), task[0]),
+        )
+        self.pending.remove(task)
+        return task
+
+    def _done(self, key, executor, callback, future):
+        # The task only frees its worker once its callback has added the
+        # tasks that follow it, so run() does not stop in between
+        try:
+            if self.cancelled or future.cancelled():
+                return
+            if callback is not None and future.exception() is None:
+                callback(key, future.result())
+        finally:
+            with self.condition:
+                self.running[executor] -= 1
+                self.condition.notify()
+
+    def run(self):
+        with self.condition:
+            while (self.pending or any(self.running.values())) and not self.cancelled:
+                task = self._next_task()
+                while task is not None:
+                    _, key, func, args, callback, executor, _ = task
+                    self.running[executor] += 1
+                    future = self.executors[executor][0].submit(func, *args)
+                    future.add_done_callback(
+                        lambda future, key=key, executor=executor, callback=callback: (
+                            self._done(key, executor, callback, future)
+                        )
+                    )
+                    self.futures.append(future)
+                    task = self._next_task()
+                self.condition.wait()
+
+        if self.cancelled:
+            raise Cancelled()
+
+        # Raise the first error of the run, if any
+        for future in self.futures:
+            future.result()
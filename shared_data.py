@@ -0,0 +1,111 @@
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+import instrumentation
+
+# Segments attached by this worker process, kept open between the tasks of a run
+_attached = {}
+
+
+def _new_shared(shape, dtype):
+    dtype = np.dtype(dtype)
+    size = int(np.prod(shape)) * dtype.itemsize
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    block = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    return shm, block, (shm.name, shape, dtype.str)
+
+
+def _to_shared(values):
+    shm, block, descriptor = _new_shared(values.shape, values.dtype)
+    block[:] = values
+    return shm, descriptor
+
+
+def share_dataframe(ehp_data):
+    # Place the numeric columns once in shared memory, one segment per dtype
+    # stored column by column, and return a small picklable descriptor the
+    # workers rebuild the frame from. Each column is copied straight into its
+    # row of the segment, without a temporary copy of the frame.
+    segments = []
+    descriptor = {"blocks": [], "index": None, "others": None}
+
+    dtypes = ehp_data.dtypes
+    numeric = [
+        column
+        for column in ehp_data.columns
+        if np.issubdtype(dtypes[column], np.number)
+    ]
+    for dtype in dict.fromkeys(dtypes[column] for column in numeric):
+        columns = [column for column in numeric if dtypes[column] == dtype]
+        shm, block, shared = _new_shared((len(columns), len(ehp_data)), dtype)
+        for row, column in enumerate(columns):
+            block[row] = ehp_data[column].to_numpy()
+        segments.append(shm)
+        descriptor["blocks"].append((columns, shared))
+
+    index = ehp_data.index.to_numpy()
+    if index.dtype == object:
+        index = index.astype(str)
+    shm, block = _to_shared(index)
+    segments.append(shm)
+    descriptor["index"] = (ehp_data.index.name, block)
+
+    # Non numeric columns are rare and small, they are sent with the descriptor
+    others = ehp_data.columns.difference(numeric, sort=False)
+    if len(others):
+        descriptor["others"] = ehp_data[others]
+
+    return descriptor, segments
+
+
+def release(segments):
+    for shm in segments:
+        shm.close()
+        shm.unlink()
+
+
+def _attach(block):
+    name, shape, dtype = block
+    shm = _attached.get(name)
+    if shm is None:
+        shm = shared_memory.SharedMemory(name=name)
+        _attached[name] = shm
+    # Workers only read the shared data
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    array.flags.writeable = False
+    return array
+
+
+def _detach_others(descriptor):
+    # Drop the segments of previous runs still attached in this worker
+    names = {block[0] for _, block in descriptor["blocks"]}
+    names.add(descriptor["index"][1][0])
+    for name in list(_attached):
+        if name not in names:
+            try:
+                _attached.pop(name).close()
+            except BufferError:
+                pass
+
+
+def attach_dataframe(descriptor):
+    _detach_others(descriptor)
+
+    index_name, block = descriptor["index"]
+    index = pd.Index(_attach(block), name=index_name)
+
+    # Zero-copy views on the shared segments
+    frames = [
+        pd.DataFrame(_attach(block).T, columns=columns, index=index, copy=False)
+        for columns, block in descriptor["blocks"]
+    ]
+    if descriptor["others"] is not None:
+        frames.append(descriptor["others"].set_axis(index))
+
+    return pd.concat(frames, axis=1, copy=False)
+
+
+def run_shared(func, descriptor, *args):
+    with instrumentation.stage("attach"):
+        ehp_data = attach_dataframe(descriptor)
+    return func(ehp_data, *args)
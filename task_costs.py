@@ -0,0 +1,61 @@
+import json
+import os
+import threading
+import data_cache
+
+# Wall time of each task in the previous runs, by task name ("chart:rcp",
+# "document:rcp", "hors_criteres"). The longest tasks of a run are submitted
+# first, so that the run does not end with a long task on a single worker.
+COSTS_FILE = "task_costs.json"
+
+# Weight of the last run in the expected duration of a task
+SMOOTHING = 0.5
+
+_lock = threading.Lock()
+_costs = None
+
+
+def costs_path():
+    return os.path.join(data_cache.cache_folder_path(), COSTS_FILE)
+
+
+def _load():
+    global _costs
+    if _costs is None:
+        try:
+            with open(costs_path(), encoding="utf-8") as f:
+                _costs = json.load(f)
+        except (OSError, ValueError):
+            _costs = {}
+    return _costs
+
+
+def expected(name):
+    # Expected wall time of a task, 0 when it never ran
+    with _lock:
+        return _load().get(name, 0.0)
+
+
+def update(records):
+    # Fold the tasks of a finished run into the expected durations
+    with _lock:
+        costs = _load()
+        for record in records:
+            if not record["args"].get("task"):
+                continue
+            previous = costs.get(record["name"])
+            duration = record["wall_s"]
+            if previous is not None:
+                duration = SMOOTHING * duration + (1 - SMOOTHING) * previous
+            costs[record["name"]] = round(duration, 4)
+
+        path = costs_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = "%s.tmp%d" % (path, os.getpid())
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(costs, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, path)
+        except OSError:
+            # Only the order of the next runs depends on it
+            pass
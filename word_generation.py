@@ -1,22 +1,55 @@
+import copy
 import docx
+import io
 import os
 from docx.shared import Cm
 from PIL import Image
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_BREAK
+from docx.oxml.ns import qn
+from docx.table import Table
+from docx.text.paragraph import Paragraph
 
 
-def word_generation(image, text, template, output, name):
-    # Open the image and rotate it by 90 degrees
-    image = Image.open(image)
-    rotated_image = image.rotate(90, resample=Image.BICUBIC, expand=True)
-    rotated_image.save(name + ".png")
+# Templates already parsed by this process, keyed by path and modification time
+_templates = {}
 
-    # Open the Word document
-    doc = docx.Document(template)
+
+def load_template(template):
+    # Parse the template once and hand out in-memory clones of it
+    key = (os.path.abspath(template), os.path.getmtime(template))
+    doc = _templates.get(key)
+    if doc is None:
+        doc = docx.Document(template)
+        _templates[key] = doc
+    return copy.deepcopy(doc)
+
+
+def rotate_image(image):
+    # Rotate the rendered PNG bytes by 90 degrees, a transpose is lossless
+    rotated_image = io.BytesIO()
+    with Image.open(io.BytesIO(image)) as img:
+        img.transpose(Image.Transpose.ROTATE_90).save(rotated_image, format="PNG")
+    return rotated_image.getvalue()
+
+
+def word_generation(image, text, template, output):
+    write_document(rotate_image(image), text, template, output)
+
+
+def write_document(rotated_image, text, template, output):
+    # Word document of an image already rotated by rotate_image
+
+    # Clone the parsed Word template
+    doc = load_template(template)
 
     # Get the table in the document (assuming it's the first table)
-    table = doc.tables[0]
+    fill_page(doc.tables[0], rotated_image, text)
+
+    # Save the modified document
+    doc.save(output)
+
 
+def fill_page(table, rotated_image, text):
     # Add an image
     cell_image = table.cell(3, 0)
 
@@ -25,9 +58,8 @@ def word_generation(image, text, template, output, name):
     paragraph = cell_image.add_paragraph()
 
     # Add a run with the image
-    image_path = name + ".png"
     run = paragraph.add_run()
-    run.add_picture(image_path, height=Cm(23))
+    run.add_picture(io.BytesIO(rotated_image), height=Cm(23))
     cell_image.vertical_alignment = docx.enum.table.WD_CELL_VERTICAL_ALIGNMENT.CENTER
     cell_image.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
 
@@ -41,8 +73,46 @@ def word_generation(image, text, template, output, name):
     run.font.name = "Arial"
     run.font.size = docx.shared.Pt(11)
 
-    # Save the modified document
-    doc.save(output)
 
-    # Delete the temporary file
-    os.remove(name + ".png")
+def report_generation(rotated_images, text, template, output, summary=None):
+    # One document with a page of the template per image, written once. The
+    # template is parsed once and its media, such as the logo, are shared by
+    # every page.
+    doc = load_template(template)
+    body = doc.element.body
+    page = [element for element in body if element.tag != qn("w:sectPr")]
+    for element in page:
+        body.remove(element)
+
+    for number, rotated_image in enumerate(rotated_images):
+        elements = [copy.deepcopy(element) for element in page]
+        for element in elements:
+            body.insert(len(body) - 1, element)
+            if number:
+                # Drawings of the template, such as the logo, need ids of
+                # their own on every page
+                for drawing in element.iter(qn("wp:docPr")):
+                    drawing.set("id", str(doc.part.next_id))
+        if number < len(rotated_images) - 1 or summary:
+            # Next page after the last paragraph of this one
+            paragraphs = [e for e in elements if e.tag == qn("w:p")]
+            if paragraphs:
+                Paragraph(paragraphs[-1], doc._body).add_run().add_break(WD_BREAK.PAGE)
+        table = Table(next(e for e in elements if e.tag == qn("w:tbl")), doc._body)
+        fill_page(table, rotated_image, text)
+
+    if summary:
+        # Number of excursions of each criterion
+        title = doc.add_paragraph().add_run("Hors critères")
+        title.bold = True
+        title.font.name = "Arial"
+        title.font.size = docx.shared.Pt(14)
+        table = doc.add_table(rows=1, cols=2)
+        for cell, heading in zip(table.rows[0].cells, ["Critère", "Excursions"]):
+            cell.paragraphs[0].add_run(heading).bold = True
+        for name, count in summary.items():
+            cells = table.add_row().cells
+            cells[0].text = name
+            cells[1].text = str(count)
+
+    doc.save(output)